@@ -1 +1,2 @@
 from .envs.pairs_trading_env import PairsTradingEnv, PairsTradingEnvV2
+from .envs.portfolio_trading_env import PortfolioTradingEnv
@@ -0,0 +1,245 @@
+"""Classical pairs trading strategies, computed over whole price histories at once.
+
+Every strategy takes the prices of both stocks, shape (..., n_days), and returns positions of the same shape:
+1 when holding stock 1, -1 when holding stock 2 and 0 when out of the spread, the same choice TradingSim makes
+when buying the spread. Thresholds can be arrays broadcasting against the leading axes, for example shape
+(n_params, 1) for prices of shape (n_pairs, n_days), to evaluate many thresholds over many pairs in one call.
+"""
+import itertools
+
+import numpy as np
+
+from .performance_metrics import compute_metrics
+from .rolling import rolling_sum, rolling_mean_std
+
+def band_positions(score, entry, exit):
+    """Turns a mean reverting score into positions. Stock 1 is bought when the score falls below -entry and
+    held until it rises back above -exit, and stock 2 is bought when the score rises above entry and held
+    until it falls back below exit. Days without a score are out of the spread.
+
+    Arguments:
+        score {numpy.Array} -- score, such as a z-score, shape (..., n_days)
+        entry {float} -- entry threshold
+        exit {float} -- exit threshold, below entry
+
+    Returns:
+        numpy.Array -- positions, shape broadcast from all arguments
+    """
+    entry = np.asarray(entry)[..., None] if np.ndim(entry) else entry
+    exit = np.asarray(exit)[..., None] if np.ndim(exit) else exit
+    score = np.where(np.isnan(score), 0, score)
+    previous = np.concatenate([np.zeros(score.shape[:-1] + (1,)), score[..., :-1]], axis=-1)
+
+    # Exits are threshold crossings, which only happen while holding the matching position
+    flat = ((previous < -exit) & (score >= -exit)) | ((previous > exit) & (score <= exit))
+    signal = np.where(score < -entry, 1, np.where(score > entry, -1, np.where(flat, 0, np.nan)))
+    return _forward_fill(signal)
+
+def zscore_positions(prices_1, prices_2, window, entry=2.0, exit=0.5):
+    """Z-score bands on the log price ratio, using its rolling mean and standard deviation.
+
+    Arguments:
+        prices_1 {numpy.Array} -- stock 1 prices, shape (..., n_days)
+        prices_2 {numpy.Array} -- stock 2 prices, shape (..., n_days)
+        window {int} -- rolling window in days
+
+    Keyword Arguments:
+        entry {float} -- entry z-score (default: {2.0})
+        exit {float} -- exit z-score (default: {0.5})
+
+    Returns:
+        numpy.Array -- positions
+    """
+    spread = np.log(prices_1) - np.log(prices_2)
+    mean, std = rolling_mean_std(spread, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return band_positions((spread - mean) / std, entry, exit)
+
+def bollinger_positions(prices_1, prices_2, window, entry=2.0, exit=0.0):
+    """Bollinger bands on the price ratio, entering outside `entry` standard deviations and exiting at
+    the moving average when `exit` is 0.
+
+    Arguments:
+        prices_1 {numpy.Array} -- stock 1 prices, shape (..., n_days)
+        prices_2 {numpy.Array} -- stock 2 prices, shape (..., n_days)
+        window {int} -- moving average window in days
+
+    Keyword Arguments:
+        entry {float} -- band width in standard deviations (default: {2.0})
+        exit {float} -- exit distance from the moving average in standard deviations (default: {0.0})
+
+    Returns:
+        numpy.Array -- positions
+    """
+    ratio = prices_1 / prices_2
+    mean, std = rolling_mean_std(ratio, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return band_positions((ratio - mean) / std, entry, exit)
+
+def distance_positions(prices_1, prices_2, window, entry=2.0, exit=0.0):
+    """Distance method of Gatev et al. Every day looks back on a formation period of the previous `window`
+    days. Both prices are normalised to 1 at the start of the formation period, and the distance between
+    them is measured in standard deviations of their distance during the formation period.
+
+    Arguments:
+        prices_1 {numpy.Array} -- stock 1 prices, shape (..., n_days)
+        prices_2 {numpy.Array} -- stock 2 prices, shape (..., n_days)
+        window {int} -- formation period in days
+
+    Keyword Arguments:
+        entry {float} -- entry distance in standard deviations (default: {2.0})
+        exit {float} -- exit distance in standard deviations (default: {0.0})
+
+    Returns:
+        numpy.Array -- positions
+    """
+    # Moments of the formation period ending the day before, shape (..., n_days)
+    lag = lambda x, days: np.concatenate([np.full(x.shape[:-1] + (days,), np.nan), x[..., :-days]], axis=-1)
+    mean_1, std_1 = rolling_mean_std(prices_1, window)
+    mean_2, std_2 = rolling_mean_std(prices_2, window)
+    covariance = rolling_sum(prices_1 * prices_2, window) / window - mean_1 * mean_2
+    std_1, std_2, covariance = lag(std_1, 1), lag(std_2, 1), lag(covariance, 1)
+
+    # Dividing by the prices at the start of the formation period rescales its moments
+    start_1, start_2 = lag(prices_1, window), lag(prices_2, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        distance = prices_1 / start_1 - prices_2 / start_2
+        variance = (std_1 / start_1) ** 2 + (std_2 / start_2) ** 2 - 2 * covariance / (start_1 * start_2)
+        return band_positions(distance / np.sqrt(np.maximum(variance, 0)), entry, exit)
+
+def cointegration_positions(prices_1, prices_2, window, entry=2.0, exit=0.5):
+    """Cointegration thresholds. The log price of stock 1 is regressed on the log price of stock 2 over a
+    rolling window, and the residual is traded in standard deviations of the window's residuals.
+
+    Arguments:
+        prices_1 {numpy.Array} -- stock 1 prices, shape (..., n_days)
+        prices_2 {numpy.Array} -- stock 2 prices, shape (..., n_days)
+        window {int} -- regression window in days
+
+    Keyword Arguments:
+        entry {float} -- entry residual in standard deviations (default: {2.0})
+        exit {float} -- exit residual in standard deviations (default: {0.5})
+
+    Returns:
+        numpy.Array -- positions
+    """
+    y = np.log(prices_1)
+    x = np.log(prices_2)
+    mean_x, std_x = rolling_mean_std(x, window)
+    mean_y, std_y = rolling_mean_std(y, window)
+    covariance = rolling_sum(x * y, window) / window - mean_x * mean_y
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hedge_ratio = covariance / std_x ** 2
+        residual_std = np.sqrt(np.maximum(std_y ** 2 - hedge_ratio ** 2 * std_x ** 2, 0))
+        residual = y - mean_y - hedge_ratio * (x - mean_x)
+        return band_positions(residual / residual_std, entry, exit)
+
+STRATEGIES = {
+    'zscore': zscore_positions,
+    'bollinger': bollinger_positions,
+    'distance': distance_positions,
+    'cointegration': cointegration_positions,
+}
+
+def simulate_positions(positions, prices_1, prices_2, start_balance=10000, transaction_fee=10):
+    """Prices positions with the rules of TradingSim: the whole cash balance buys as many shares of the held
+    stock as possible, and every buy or sell costs the transaction fee. Days are stepped in order, but every
+    strategy and pair is updated at once.
+
+    Arguments:
+        positions {numpy.Array} -- positions, shape (..., n_days)
+        prices_1 {numpy.Array} -- stock 1 prices, broadcastable to positions
+        prices_2 {numpy.Array} -- stock 2 prices, broadcastable to positions
+
+    Keyword Arguments:
+        start_balance {float} -- starting cash balance (default: {10000})
+        transaction_fee {float} -- how much it costs to perform a trade (default: {10})
+
+    Returns:
+        numpy.Array -- net asset value at the end of every day, same shape as positions
+    """
+    positions, prices_1, prices_2 = np.broadcast_arrays(positions, prices_1, prices_2)
+    shape = positions.shape[:-1]
+
+    balance = np.full(shape, float(start_balance))
+    units = np.zeros(shape)
+    held = np.zeros(shape)
+    nav = np.empty(positions.shape)
+
+    for t in range(positions.shape[-1]):
+        position = positions[..., t]
+        price = np.where(position > 0, prices_1[..., t], prices_2[..., t])
+        held_price = np.where(held > 0, prices_1[..., t], prices_2[..., t])
+        changed = position != held
+
+        selling = changed & (held != 0)
+        balance = balance + np.where(selling, units * held_price - transaction_fee, 0)
+        units = np.where(selling, 0, units)
+
+        buying = changed & (position != 0)
+        bought = np.maximum((balance - transaction_fee) // price, 0)
+        balance = balance - np.where(buying, bought * price + transaction_fee, 0)
+        units = np.where(buying, bought, units)
+
+        held = position
+        nav[..., t] = balance + units * price
+    return nav
+
+def grid_search(strategy, prices_1, prices_2, param_grid, **kwargs):
+    """Evaluates a strategy for every combination of parameters over every pair.
+
+    Arguments:
+        strategy {str} -- name of the strategy in STRATEGIES
+        prices_1 {numpy.Array} -- stock 1 prices, shape (n_pairs, n_days)
+        prices_2 {numpy.Array} -- stock 2 prices, shape (n_pairs, n_days)
+        param_grid {dict} -- lists of values for 'window', 'entry' and 'exit'
+
+    Key Word Arguments:
+        Passed to simulate_positions.
+
+    Returns:
+        tuple -- (list of parameter dicts, dict of metrics each of shape (n_params, n_pairs))
+    """
+    strategy = STRATEGIES[strategy]
+    params = [dict(zip(('window', 'entry', 'exit'), values)) for values in itertools.product(
+        param_grid['window'], param_grid['entry'], param_grid['exit'])]
+
+    results = []
+    for window in param_grid['window']:
+        indices = [i for i, p in enumerate(params) if p['window'] == window]
+        entry = np.array([params[i]['entry'] for i in indices])[:, None]
+        exit = np.array([params[i]['exit'] for i in indices])[:, None]
+
+        positions = strategy(prices_1, prices_2, window, entry, exit)
+        nav = simulate_positions(positions, prices_1, prices_2, **kwargs)
+        results.append(compute_metrics(nav, positions))
+
+    metrics = {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+    return params, metrics
+
+def _forward_fill(signal):
+    """Replaces NaN values with the last value before them along the last axis, and leading NaN values with 0.
+    """
+    days = np.arange(signal.shape[-1])
+    last_valid = np.maximum.accumulate(np.where(np.isnan(signal), -1, days), axis=-1)
+    filled = np.take_along_axis(signal, np.maximum(last_valid, 0), axis=-1)
+    return np.where(last_valid < 0, 0, filled)
+
+
+if __name__=='__main__':
+    import time
+
+    from .synthetic_data import SyntheticPairGenerator
+
+    chunk = SyntheticPairGenerator(n_pairs=10, seed=0).next_chunk(1260)
+    prices_1 = chunk['adjusted_close'][:, :, 0]
+    prices_2 = chunk['adjusted_close'][:, :, 1]
+    grid = {'window': [10, 20, 40, 60], 'entry': np.linspace(1, 3, 16), 'exit': np.linspace(0, 0.9, 16)}
+
+    for name in STRATEGIES:
+        start = time.time()
+        params, metrics = grid_search(name, prices_1, prices_2, grid)
+        best = np.nanargmax(np.nanmean(metrics['sharpe'], axis=1))
+        print(f"{name}: {len(params)} combinations x {len(prices_1)} pairs in {time.time() - start:.2f}s, "
+            f"best {params[best]}")
@@ -0,0 +1,145 @@
+import numpy as np
+
+from .data_source import ArrayDataSource
+
+class BlockBootstrapSampler(object):
+    """Generates resampled episodes from a pair's history. Daily log returns of both stocks are resampled
+    jointly in blocks, so the correlation between the stocks and short term autocorrelation are kept, and
+    are then integrated back into prices."""
+
+    def __init__(self, data, block_size=20, method='stationary', seed=None):
+        """Creates a BlockBootstrapSampler instance.
+
+        Arguments:
+            data {numpy.Array} -- rows of [stock 1 close, stock 2 close, stock 1 percent change,
+                stock 2 percent change] as returned by DataSource, shape (days, 4)
+
+        Keyword Arguments:
+            block_size {int} -- block length, the average block length for the stationary bootstrap (default: {20})
+            method {str} -- either 'stationary' (random block lengths) or 'moving' (fixed block lengths)
+                (default: {'stationary'})
+            seed {int} -- seed for the random number generator (default: {None})
+        """
+        if method not in ('stationary', 'moving'):
+            raise ValueError(f"Unknown bootstrap method {method}")
+
+        data = np.asarray(data)
+        closes = data[:, :2]
+
+        self.block_size = block_size
+        self.method = method
+
+        self._first_row = data[0]
+        self._log_returns = np.log(closes[1:] / closes[:-1])
+        self._percent_changes = data[1:, 2:]
+        self._rng = np.random.default_rng(seed)
+
+        if method == 'moving' and block_size > len(self._log_returns):
+            raise ValueError("Block size is longer than the data")
+
+    @classmethod
+    def from_data_source(cls, data_source, **kwargs):
+        """Creates a sampler from every row of a data source.
+
+        Arguments:
+            data_source {DataSource} -- data source to read
+
+        Returns:
+            BlockBootstrapSampler -- the sampler
+        """
+        return cls(ArrayDataSource.from_data_source(data_source).data, **kwargs)
+
+    def sample_indices(self, n_episodes, length):
+        """Samples which historical day each resampled day is taken from.
+
+        Arguments:
+            n_episodes {int} -- number of episodes
+            length {int} -- number of resampled days per episode
+
+        Returns:
+            numpy.Array -- indices into the daily returns, shape (n_episodes, length)
+        """
+        n_returns = len(self._log_returns)
+        days = np.arange(length)
+
+        if self.method == 'stationary':
+            new_block = self._rng.random((n_episodes, length)) < 1 / self.block_size
+            new_block[:, 0] = True
+            block_day = np.maximum.accumulate(np.where(new_block, days, 0), axis=1)
+            starts = self._rng.integers(0, n_returns, (n_episodes, length))
+            return (np.take_along_axis(starts, block_day, axis=1) + days - block_day) % n_returns
+        else:
+            n_blocks = -(-length // self.block_size)
+            starts = self._rng.integers(0, n_returns - self.block_size + 1, (n_episodes, n_blocks))
+            return starts[:, days // self.block_size] + days % self.block_size
+
+    def sample(self, n_episodes, length):
+        """Samples a batch of episodes. Every episode starts at the first row of the data.
+
+        Arguments:
+            n_episodes {int} -- number of episodes
+            length {int} -- number of days per episode, including the first row
+
+        Returns:
+            numpy.Array -- rows in the same layout as the data, shape (n_episodes, length, 4)
+        """
+        indices = self.sample_indices(n_episodes, length - 1)
+
+        cumulative_returns = np.cumsum(self._log_returns[indices], axis=1)
+        cumulative_returns = np.concatenate([np.zeros((n_episodes, 1, 2)), cumulative_returns], axis=1)
+        closes = self._first_row[:2] * np.exp(cumulative_returns)
+
+        first_changes = np.broadcast_to(self._first_row[2:], (n_episodes, 1, 2))
+        percent_changes = np.concatenate([first_changes, self._percent_changes[indices]], axis=1)
+
+        return np.concatenate([closes, percent_changes], axis=2)
+
+
+class BootstrapDataSource(ArrayDataSource):
+    """Data source that moves on to a new bootstrapped episode on every reset. Episodes are sampled
+    a batch at a time, so PairsTradingEnv can train on fresh data without any per episode setup."""
+
+    def __init__(self, sampler, length, batch_size=64, precision=None):
+        """Initialises a bootstrap data source.
+
+        Arguments:
+            sampler {BlockBootstrapSampler} -- sampler generating the episodes
+            length {int} -- number of days per episode
+
+        Keyword Arguments:
+            batch_size {int} -- number of episodes sampled at once (default: {64})
+            precision {str} -- 'float64' or 'float32' to convert the episodes (default: {None})
+        """
+        self.sampler = sampler
+        self.length = length
+        self.batch_size = batch_size
+
+        # Initialising resets, which samples the first batch. Rewind so the first reset by the environment
+        # starts its first episode rather than skipping it
+        self._episode = batch_size - 1
+        super(BootstrapDataSource, self).__init__(np.zeros((length, 4)), precision=precision)
+        self._episode = -1
+
+    def reset(self):
+        """Start the next episode
+        """
+        self.next_episode()
+
+    def next_episode(self):
+        """Moves on to the next episode, sampling a new batch when the current one is used up.
+        """
+        self._episode += 1
+        if self._episode >= self.batch_size:
+            self._batch = np.asarray(self.sampler.sample(self.batch_size, self.length), dtype=self.dtype)
+            self._episode = 0
+        self.data = self._batch[self._episode]
+        self._i = 0
+
+
+if __name__=='__main__':
+    from .synthetic_data import SyntheticDataSource
+
+    sampler = BlockBootstrapSampler.from_data_source(SyntheticDataSource(n_days=1000), seed=0)
+    episodes = sampler.sample(4, 250)
+    print(episodes.shape)
+    print(episodes[:, -1, :2])
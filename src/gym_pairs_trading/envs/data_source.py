@@ -10,6 +10,50 @@ TIME_SERIES_GETTER = TimeSeries(API_KEY, output_format='pandas')
 
 CACHE_DIRECTORY = './data'
 
+# Alpha Vantage columns read by DataSource, every other column is dropped unless asked for
+USED_COLUMNS = ['1. open', '4. close', '8. split coefficient']
+
+# Columns needed by DataSource.ohlc, for fills inside a bar
+OHLC_COLUMNS = ['1. open', '2. high', '3. low', '4. close', '8. split coefficient']
+
+PRECISIONS = {'float64': np.float64, 'float32': np.float32}
+
+# Largest errors of float32 data compared to float64, checked by the tests. Prices are relative errors of
+# two roundings, storing the price and multiplying it by the cumulative split coefficient, which rounds
+# unless the coefficient is a power of two. The others are absolute errors of values computed from prices,
+# except net asset values which are relative errors. Cash is float64, so net asset value and reward errors
+# only come from prices, and hold over a ten year episode as long as both precisions buy the same number
+# of shares, which rounding down cash to whole shares can break.
+FLOAT32_ERROR_BOUNDS = {
+    'price': 2 ** -23,
+    'percent_change': 1e-6,
+    'spread': 1e-5,
+    'nav': 1e-5,
+    'reward': 1e-6,
+}
+
+def to_day_index(dates):
+    """Converts dates to compact day numbers since 1970-01-01.
+
+    Arguments:
+        dates {list} -- dates, datetimes or date strings
+
+    Returns:
+        numpy.Array -- int32 day numbers
+    """
+    return np.array(dates, dtype='datetime64[D]').astype(np.int32)
+
+def from_day_index(day):
+    """Converts a day number from `to_day_index` back to a date.
+
+    Arguments:
+        day {int} -- day number
+
+    Returns:
+        datetime.date -- the date
+    """
+    return (np.datetime64(0, 'D') + int(day)).item()
+
 class DataSource(object):
     """Retrieves stock price data from AlphaVantage"""
     def __init__(self, symbol_1, symbol_2, **kwargs):
@@ -23,9 +67,13 @@ class DataSource(object):
         Key Word Arguments:
             size {str} -- Size of data to retrieve from alpha vantage, either full or compact
             cache_data {bool} -- Whether to cache data or store only in memory
+            precision {str} -- 'float64' or 'float32', the precision data is stored and returned in
+            columns {list} -- Alpha Vantage columns to keep, None to keep all (default: USED_COLUMNS)
         """
         size = kwargs.get('size', 'full')
         cache = kwargs.get('cache_data', True)
+        self.dtype = PRECISIONS[kwargs.get('precision', 'float64')]
+        columns = kwargs.get('columns', USED_COLUMNS)
 
         if cache:
             today = str(datetime.today().date())
@@ -35,6 +83,9 @@ class DataSource(object):
             self.d1, _ = TIME_SERIES_GETTER.get_daily_adjusted(symbol_1, outputsize=size)
             self.d2, _ = TIME_SERIES_GETTER.get_daily_adjusted(symbol_2, outputsize=size)
 
+        self.d1 = self.compact(self.d1, columns)
+        self.d2 = self.compact(self.d2, columns)
+
         self.starting_date = max(min(self.d1.index), min(self.d2.index)) # highest start date
         self.end_date      = min(max(self.d1.index), max(self.d2.index)) # lowest end date
 
@@ -86,7 +137,7 @@ class DataSource(object):
             s1_percent_change = (s1_close - s1_open) / s1_open
             s2_percent_change = (s2_close - s2_open) / s2_open
 
-            return (self.current_day.date(), np.array([s1_close, s2_close, s1_percent_change, s2_percent_change], dtype=np.float))
+            return (self.current_day.date(), np.array([s1_close, s2_close, s1_percent_change, s2_percent_change], dtype=self.dtype))
         raise StopIteration
 
     def reset(self):
@@ -96,6 +147,44 @@ class DataSource(object):
         self.s1_split_coefficient = 1
         self.s2_split_coefficient = 1
 
+    def ohlc(self):
+        """Returns split adjusted open, high, low and close prices of both stocks for every row the iterator
+        returns, for the fill engine in order_fills. The data source must keep OHLC_COLUMNS.
+
+        Returns:
+            tuple -- (dates, bars) where bars has shape (days, 2, 4), the last axis being open, high, low, close
+        """
+        missing = [column for column in OHLC_COLUMNS if column not in self.d1.columns or column not in self.d2.columns]
+        if missing:
+            raise ValueError(f"DataSource was created without columns {missing}, pass columns=OHLC_COLUMNS")
+
+        # The same rows as __next__, which starts the day after the starting date
+        dates = self.d1.index.intersection(self.d2.index)
+        dates = dates[(dates > self.starting_date) & (dates <= self.end_date)].sort_values()
+
+        bars = []
+        for data in (self.d1, self.d2):
+            rows = data.loc[dates]
+            split_coefficient = np.cumprod(rows['8. split coefficient'].to_numpy())
+            bars.append(rows[OHLC_COLUMNS[:4]].to_numpy() * split_coefficient[:, None])
+        return [date.date() for date in dates], np.stack(bars, axis=1).astype(self.dtype)
+
+    def compact(self, data, columns):
+        """Drops unused columns and converts the data to the data source's precision.
+
+        Arguments:
+            data {pandas.Dataframe} -- data dataframe
+            columns {list} -- columns to keep, None to keep all
+
+        Returns:
+            pandas.Dataframe -- data dataframe
+        """
+        if columns is not None:
+            data = data[columns]
+        data = data.astype(self.dtype)
+        data.index = pd.DatetimeIndex(data.index)
+        return data
+
     def get_from_cache_or_download_and_cache(self, symbol, date, size):
         """Downloads data from alpha vantage, and caches. If data is already downloaded
         load it from cache.
@@ -120,6 +209,119 @@ class DataSource(object):
             data.to_csv(file_name, index_label=False)
             return data
 
+class ArrayDataSource(object):
+    """Iterates stock pair data held in memory, with the same interface as DataSource"""
+    def __init__(self, data, dates=None, precision=None):
+        """Initialises an in memory data source.
+
+        Arguments:
+            data {numpy.Array} -- rows of [stock 1 close, stock 2 close, stock 1 percent change,
+                stock 2 percent change], shape (days, 4)
+
+        Keyword Arguments:
+            dates {list} -- date of each row, stored as int32 day numbers. Integer dates, such as the
+                trading day numbers of an undated source, are kept as they are. The trading day number is
+                used when not given (default: {None})
+            precision {str} -- 'float64' or 'float32' to convert the data, None to keep it as given (default: {None})
+        """
+        self.dtype = PRECISIONS[precision] if precision is not None else None
+        self.set_data(data, dates)
+
+    @classmethod
+    def from_data_source(cls, data_source, precision=None):
+        """Reads every row of a data source into memory.
+
+        Arguments:
+            data_source {DataSource} -- data source to read
+
+        Keyword Arguments:
+            precision {str} -- 'float64' or 'float32' to convert the data (default: {None})
+
+        Returns:
+            ArrayDataSource -- in memory copy of the data source
+        """
+        dates, rows = [], []
+        for date, data in data_source:
+            dates.append(date)
+            rows.append(data)
+        data_source.reset()
+        return cls(np.array(rows), dates, precision)
+
+    def set_data(self, data, dates=None):
+        """Replaces the data being iterated, and resets the iterator.
+
+        Arguments:
+            data {numpy.Array} -- rows of data, shape (days, 4)
+
+        Keyword Arguments:
+            dates {list} -- date of each row (default: {None})
+        """
+        self.data = np.asarray(data, dtype=self.dtype)
+        self.day_index = None
+        self._row_numbers = None
+        if dates is not None and np.issubdtype(np.asarray(dates).dtype, np.integer):
+            self._row_numbers = np.asarray(dates)
+        elif dates is not None:
+            self.day_index = to_day_index(dates)
+
+        self.starting_date = self.date(0)
+        self.end_date = self.date(len(self.data) - 1)
+
+        self.reset()
+
+    def date(self, i):
+        """Returns the date of a row
+
+        Arguments:
+            i {int} -- row number
+
+        Returns:
+            datetime.date -- the date, or the row number when the data has no dates
+        """
+        if self._row_numbers is not None:
+            return int(self._row_numbers[i])
+        if self.day_index is None:
+            return i
+        return from_day_index(self.day_index[i])
+
+    @property
+    def dates(self):
+        """Dates of every row
+        """
+        return [self.date(i) for i in range(len(self.data))]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        """Return a new iterator of stock pair data
+
+        Returns:
+            ArrayDataSource -- The iterator
+        """
+        self.reset()
+        return self
+
+    def __next__(self):
+        """Returns the next data row in the dataset
+
+        Raises:
+            StopIteration: When last row reached
+
+        Returns:
+            tuple -- Data source information, such as current date, prices, and percentage changes.
+        """
+        if self._i >= len(self.data):
+            raise StopIteration
+        i = self._i
+        self._i += 1
+        return (self.date(i), self.data[i])
+
+    def reset(self):
+        """Reset iterator
+        """
+        self._i = 0
+
 if __name__=="__main__":
     ds = DataSource("AAPL", "MSFT", size='full', cache=True)
     for date, data in ds: print(date, data)
@@ -0,0 +1,441 @@
+"""Rollout workers hosting batches of environments behind TCP sockets, and a coordinator stepping them together.
+
+Messages are a fixed header followed by raw little endian arrays, so no pickling happens on either side:
+
+    magic (4 bytes) | message type (uint8) | rows (uint32) | columns (uint32) | value (float32) | payload
+
+A STEP message carries the penalty as its value and one int32 action per environment. The TRANSITION reply
+carries float32 observations (rows x columns), float32 rewards and uint8 done flags. Environments are reset as
+soon as they are done, so the observation returned with a done flag starts the next episode.
+"""
+
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b'PTRW'
+HEADER = struct.Struct('!4sBIIf')
+
+HELLO, SPEC, RESET, STEP, OBSERVATIONS, TRANSITION, ERROR, CLOSE = range(8)
+
+class WorkerError(RuntimeError):
+    """Raised when a worker replies that its environments failed, as opposed to the connection to the worker
+    failing. The worker drops the connection, as its environments may be part way through a step, and is reset
+    once the coordinator reconnects."""
+
+def send_message(sock, message_type, rows=0, columns=0, value=0.0, payload=b''):
+    """Sends a header and payload in a single write.
+    """
+    sock.sendall(HEADER.pack(MAGIC, message_type, rows, columns, value) + payload)
+
+def receive_exactly(sock, n_bytes):
+    """Receives exactly `n_bytes`, raising ConnectionError if the socket closes first.
+    """
+    buffer = bytearray(n_bytes)
+    view = memoryview(buffer)
+    received = 0
+    while received < n_bytes:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Socket closed")
+        received += count
+    return bytes(buffer)
+
+def receive_header(sock):
+    """Receives a message header.
+
+    Returns:
+        tuple -- (message type, rows, columns, value)
+    """
+    magic, message_type, rows, columns, value = HEADER.unpack(receive_exactly(sock, HEADER.size))
+    if magic != MAGIC:
+        raise ConnectionError("Invalid message")
+    return message_type, rows, columns, value
+
+class RolloutWorker(object):
+    """Hosts a batch of environments and steps them for one coordinator connection at a time. When the
+    coordinator disconnects, the worker waits for it to connect again."""
+
+    def __init__(self, env_fn, n_envs, host='127.0.0.1', port=0):
+        """Creates the environments and starts listening.
+
+        Arguments:
+            env_fn {callable} -- creates an environment with PairsTradingEnv's reset and step(action, penalty)
+            n_envs {int} -- number of environments hosted
+
+        Keyword Arguments:
+            host {str} -- address to listen on (default: {'127.0.0.1'})
+            port {int} -- port to listen on, 0 for any free port (default: {0})
+        """
+        self.envs = [env_fn() for _ in range(n_envs)]
+        self.obs_size = int(np.prod(self.envs[0].observation_space.shape))
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen(1)
+        self.address = self._server.getsockname()
+
+        self._connection = None
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        """Serves coordinators in a background thread.
+
+        Returns:
+            RolloutWorker -- the worker
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves coordinators until the worker is closed.
+        """
+        while not self._closed:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._connection = connection
+            try:
+                self._serve(connection)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                connection.close()
+                self._connection = None
+
+    def _serve(self, connection):
+        """Answers messages from one coordinator until it disconnects. When an environment raises, the error
+        is sent and the connection dropped, as some environments may have stepped and others not.
+        """
+        while True:
+            message_type, rows, _, value = receive_header(connection)
+            try:
+                if message_type == HELLO:
+                    send_message(connection, SPEC, len(self.envs), self.obs_size)
+                elif message_type == RESET:
+                    observations = np.array([np.asarray(env.reset(), dtype='<f4').ravel() for env in self.envs])
+                    send_message(connection, OBSERVATIONS, len(self.envs), self.obs_size, payload=observations.tobytes())
+                elif message_type == STEP:
+                    actions = np.frombuffer(receive_exactly(connection, rows * 4), dtype='<i4')
+                    payload = self._step(actions, value)
+                    send_message(connection, TRANSITION, len(self.envs), self.obs_size, payload=payload)
+                elif message_type == CLOSE:
+                    return
+            except (ConnectionError, OSError):
+                raise
+            except Exception as e:
+                message = repr(e).encode()
+                send_message(connection, ERROR, len(message), payload=message)
+                return
+
+    def _step(self, actions, penalty):
+        """Steps every environment, resetting those that are done.
+
+        Returns:
+            bytes -- observations, rewards and done flags
+        """
+        observations = np.empty((len(self.envs), self.obs_size), dtype='<f4')
+        rewards = np.empty(len(self.envs), dtype='<f4')
+        dones = np.empty(len(self.envs), dtype='u1')
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, reward, done, _ = env.step(int(action), penalty)
+            if done:
+                obs = env.reset()
+            observations[i] = np.asarray(obs, dtype='<f4').ravel()
+            rewards[i] = reward
+            dones[i] = done
+        return observations.tobytes() + rewards.tobytes() + dones.tobytes()
+
+    def close(self):
+        """Stops serving and closes the sockets.
+        """
+        self._closed = True
+        for sock in (self._server, self._connection):
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class RolloutCoordinator(object):
+    """Steps the environments of several rollout workers as one batch. Actions are sent to every worker before
+    any reply is read, so workers step in parallel.
+
+    A worker whose connection fails reports its environments as done, with zero observations and rewards, and
+    is reconnected on later steps. Once reconnected its environments are reset and reported as done again.
+    A worker whose environments raise is treated the same way, and its error message is kept in `errors`, so
+    the transitions of every other worker are still returned.
+    """
+
+    def __init__(self, addresses, timeout=10.0, retry_interval=1.0):
+        """Connects to the workers.
+
+        Arguments:
+            addresses {list} -- (host, port) of every worker
+
+        Keyword Arguments:
+            timeout {float} -- seconds to wait for a worker before treating it as failed (default: {10.0})
+            retry_interval {float} -- minimum seconds between reconnection attempts (default: {1.0})
+        """
+        self.addresses = list(addresses)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+
+        self._sockets = [None] * len(self.addresses)
+        self._last_attempt = [0.0] * len(self.addresses)
+        self.sizes = [0] * len(self.addresses)
+        self.obs_size = None
+        self.errors = {}
+
+        for i in range(len(self.addresses)):
+            self._connect(i)
+
+        self.n_envs = sum(self.sizes)
+        self._slices = np.cumsum([0] + self.sizes)
+
+    @property
+    def failed_workers(self):
+        """Indices of workers that are not connected
+        """
+        return [i for i, sock in enumerate(self._sockets) if sock is None]
+
+    def _connect(self, i):
+        """Connects to a worker and checks the size of its batch. Failures are raised.
+        """
+        self._last_attempt[i] = time.time()
+        sock = socket.create_connection(self.addresses[i], timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            send_message(sock, HELLO)
+            message_type, rows, columns, _ = receive_header(sock)
+            if message_type != SPEC:
+                raise ConnectionError("Unexpected reply")
+            if self.obs_size is not None and columns != self.obs_size:
+                raise ConnectionError("Worker observation size differs")
+            if self.sizes[i] and rows != self.sizes[i]:
+                raise ConnectionError("Worker batch size changed")
+        except Exception:
+            sock.close()
+            raise
+        self.sizes[i] = rows
+        self.obs_size = columns
+        self._sockets[i] = sock
+
+    def _fail(self, i):
+        """Drops the connection to a failed worker.
+        """
+        if self._sockets[i] is not None:
+            self._sockets[i].close()
+            self._sockets[i] = None
+
+    def _reconnect(self, i):
+        """Tries to reconnect to a failed worker, at most once per retry interval.
+
+        Returns:
+            bool -- whether the worker is connected
+        """
+        if time.time() - self._last_attempt[i] < self.retry_interval:
+            return False
+        try:
+            self._connect(i)
+            return True
+        except (ConnectionError, OSError):
+            return False
+
+    def _receive(self, i, message_type):
+        """Receives a reply of `message_type` from worker i.
+
+        Returns:
+            bytes -- payload
+        """
+        sock = self._sockets[i]
+        reply_type, rows, columns, _ = receive_header(sock)
+        if reply_type == ERROR:
+            message = receive_exactly(sock, rows).decode()
+            raise WorkerError(f"Worker {self.addresses[i]} failed: {message}")
+        if reply_type != message_type:
+            raise ConnectionError("Unexpected reply")
+        n_bytes = rows * columns * 4
+        if message_type == TRANSITION:
+            n_bytes += rows * 5
+        return receive_exactly(sock, n_bytes)
+
+    def _reset_worker(self, i):
+        """Resets the environments of worker i.
+
+        Returns:
+            numpy.Array -- observations
+        """
+        send_message(self._sockets[i], RESET)
+        payload = self._receive(i, OBSERVATIONS)
+        return np.frombuffer(payload, dtype='<f4').reshape(self.sizes[i], self.obs_size)
+
+    def reset(self):
+        """Resets every environment. Environments of failed workers have zero observations, and the error
+        messages of workers whose environments raised are kept in `errors`.
+
+        Returns:
+            numpy.Array -- observations, shape (n_envs, obs_size)
+        """
+        observations = np.zeros((self.n_envs, self.obs_size), dtype='<f4')
+        self.errors = {}
+        for i in range(len(self.addresses)):
+            if self._sockets[i] is None and not self._reconnect(i):
+                continue
+            try:
+                observations[self._slices[i]:self._slices[i + 1]] = self._reset_worker(i)
+            except WorkerError as e:
+                self._fail(i)
+                self.errors[i] = str(e)
+            except (ConnectionError, OSError):
+                self._fail(i)
+        return observations
+
+    def step(self, actions, penalty=1):
+        """Steps every environment.
+
+        Arguments:
+            actions {numpy.Array} -- one action per environment
+
+        Keyword Arguments:
+            penalty {float} -- passed to every environment's step (default: {1})
+
+        Returns:
+            tuple -- (observations, rewards, dones, info). info holds the indices of failed workers, and the
+                error messages of workers whose environments raised by index
+        """
+        actions = np.asarray(actions, dtype='<i4')
+        observations = np.zeros((self.n_envs, self.obs_size), dtype='<f4')
+        rewards = np.zeros(self.n_envs, dtype='<f4')
+        dones = np.ones(self.n_envs, dtype=bool)
+
+        sent = []
+        reconnected = []
+        self.errors = {}
+        for i in range(len(self.addresses)):
+            if self._sockets[i] is None:
+                if self._reconnect(i):
+                    reconnected.append(i)
+                continue
+            start, end = self._slices[i], self._slices[i + 1]
+            try:
+                send_message(self._sockets[i], STEP, end - start, value=penalty, payload=actions[start:end].tobytes())
+                sent.append(i)
+            except (ConnectionError, OSError):
+                self._fail(i)
+
+        for i in sent:
+            start, end = self._slices[i], self._slices[i + 1]
+            n = end - start
+            try:
+                payload = self._receive(i, TRANSITION)
+            except WorkerError as e:
+                self._fail(i)
+                self.errors[i] = str(e)
+                continue
+            except (ConnectionError, OSError):
+                self._fail(i)
+                continue
+            observations[start:end] = np.frombuffer(payload, '<f4', n * self.obs_size).reshape(n, self.obs_size)
+            rewards[start:end] = np.frombuffer(payload, '<f4', n, n * self.obs_size * 4)
+            dones[start:end] = np.frombuffer(payload, 'u1', n, n * (self.obs_size + 1) * 4)
+
+        for i in reconnected:
+            try:
+                observations[self._slices[i]:self._slices[i + 1]] = self._reset_worker(i)
+            except WorkerError as e:
+                self._fail(i)
+                self.errors[i] = str(e)
+            except (ConnectionError, OSError):
+                self._fail(i)
+
+        return observations, rewards, dones, {'failed_workers': self.failed_workers, 'errors': dict(self.errors)}
+
+    def close(self):
+        """Tells every worker the coordinator is leaving, and closes the connections.
+        """
+        for i, sock in enumerate(self._sockets):
+            if sock is None:
+                continue
+            try:
+                send_message(sock, CLOSE)
+            except OSError:
+                pass
+            self._fail(i)
+
+
+def _synthetic_env():
+    from .pairs_trading_env import PairsTradingEnv
+    from .synthetic_data import SyntheticDataSource
+    return PairsTradingEnv(None, None, 5, 1, data_source=SyntheticDataSource(n_days=2520))
+
+def _run_worker(port, n_envs):
+    RolloutWorker(_synthetic_env, n_envs, port=port).serve_forever()
+
+def benchmark(n_workers=4, n_envs=16, n_steps=500):
+    """Compares steps per second of one process stepping environments against workers in separate processes.
+
+    Keyword Arguments:
+        n_workers {int} -- number of worker processes (default: {4})
+        n_envs {int} -- environments per worker (default: {16})
+        n_steps {int} -- batch steps to time (default: {500})
+
+    Returns:
+        dict -- environment steps per second of each setup
+    """
+    import multiprocessing
+
+    envs = [_synthetic_env() for _ in range(n_envs)]
+    for env in envs:
+        env.reset()
+    start = time.time()
+    for _ in range(n_steps):
+        for env in envs:
+            _, _, done, _ = env.step(2, 1)
+            if done:
+                env.reset()
+    single = n_steps * n_envs / (time.time() - start)
+
+    ports = []
+    for _ in range(n_workers):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            ports.append(sock.getsockname()[1])
+    processes = [multiprocessing.Process(target=_run_worker, args=(port, n_envs), daemon=True) for port in ports]
+    for process in processes:
+        process.start()
+
+    coordinator = None
+    while coordinator is None:
+        try:
+            coordinator = RolloutCoordinator([('127.0.0.1', port) for port in ports])
+        except OSError:
+            time.sleep(0.1)
+    coordinator.reset()
+    actions = np.full(coordinator.n_envs, 2)
+    start = time.time()
+    for _ in range(n_steps):
+        coordinator.step(actions)
+    distributed = n_steps * coordinator.n_envs / (time.time() - start)
+
+    coordinator.close()
+    for process in processes:
+        process.terminate()
+    return {'single_process': single, 'workers': distributed}
+
+
+if __name__=='__main__':
+    for name, steps_per_second in benchmark().items():
+        print(f"{name}: {steps_per_second:.0f} env steps/s")
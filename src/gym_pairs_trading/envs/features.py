@@ -0,0 +1,246 @@
+"""Observation features declared once, with two implementations each.
+
+`batch` calculates a feature for a whole history at once, for training on stored data and backtests, and
+`update` calculates it one day at a time with constant cost per day, for stepping an environment. Both take
+data rows in the DataSource layout [stock 1 close, stock 2 close, stock 1 percent change, stock 2 percent change]
+and must agree, which `check_consistency` verifies. Days before a feature has enough history are 0.
+"""
+
+import collections
+
+import numpy as np
+
+from .rolling import rolling_mean_std
+
+# Rolling moments are running sums in one implementation and cumulative sum differences in the other,
+# so they agree to rounding error, which is amplified when a z-score divides by a small deviation
+CONSISTENCY_TOLERANCE = 1e-6
+
+class Feature(object):
+    """Base class of features. Subclasses set `size`, the number of values the feature produces."""
+    size = 1
+    _buffer_width = 1
+
+    def __init__(self, window=20):
+        """Creates a feature.
+
+        Keyword Arguments:
+            window {int} -- number of days of history used (default: {20})
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Clears the history of the incremental implementation.
+        """
+        self._buffer = np.zeros((self.window, self._buffer_width))
+        self._sums = np.zeros(self._buffer_width)
+        self._square_sums = np.zeros(self._buffer_width)
+        self._i = 0
+
+    def _push(self, values):
+        """Adds values to the rolling window kept by the incremental implementation, updating the running sums.
+
+        Returns:
+            bool -- whether the window is full
+        """
+        index = self._i % self.window
+        old = self._buffer[index]
+        self._sums += values - old
+        self._square_sums += values ** 2 - old ** 2
+        self._buffer[index] = values
+        self._i += 1
+        return self._i >= self.window
+
+    def _rolling_mean_std(self):
+        mean = self._sums / self.window
+        variance = self._square_sums / self.window - mean ** 2
+        return mean, np.sqrt(np.maximum(variance, 0))
+
+    def batch(self, data):
+        """Calculates the feature for every day.
+
+        Arguments:
+            data {numpy.Array} -- data rows, shape (n_days, 4), or with leading axes such as
+                (n_pairs, n_days, 4)
+
+        Returns:
+            numpy.Array -- feature values, shape (n_days, size)
+        """
+        raise NotImplementedError
+
+    def update(self, row):
+        """Adds a day and calculates the feature for it.
+
+        Arguments:
+            row {numpy.Array} -- data row, shape (4,)
+
+        Returns:
+            numpy.Array -- feature values, shape (size,)
+        """
+        raise NotImplementedError
+
+class LaggedReturns(Feature):
+    """Percentage changes of both stocks over the last `window` days, most recent first, stock 1 then stock 2,
+    as in MarketMetrics.update_percentage."""
+    _buffer_width = 2
+
+    def __init__(self, window=5):
+        self.size = 2 * window
+        super(LaggedReturns, self).__init__(window)
+
+    def batch(self, data):
+        padding = np.zeros(data.shape[:-2] + (self.window - 1, 2), dtype=data.dtype)
+        changes = np.concatenate([padding, data[..., 2:4]], axis=-2)
+        n_days = data.shape[-2]
+        lags = [changes[..., self.window - 1 - lag:self.window - 1 - lag + n_days, :] for lag in range(self.window)]
+        return np.concatenate([np.stack([lag[..., 0] for lag in lags], axis=-1),
+            np.stack([lag[..., 1] for lag in lags], axis=-1)], axis=-1)
+
+    def update(self, row):
+        self._push(row[2:4])
+        order = (self._i - 1 - np.arange(self.window)) % self.window
+        lags = self._buffer[order]
+        return np.concatenate([lags[:, 0], lags[:, 1]])
+
+class NormalisedSpread(Feature):
+    """Difference of the log prices of both stocks, each normalised by its maximum over the window, as
+    in MarketMetrics.update. The incremental maximum uses monotonic queues."""
+
+    def batch(self, data):
+        prices = data[..., :2]
+        rolling_max = prices.copy()
+        for lag in range(1, self.window):
+            rolling_max[..., lag:, :] = np.maximum(rolling_max[..., lag:, :], prices[..., :-lag, :])
+        normalised = np.log(prices / rolling_max)
+        spread = normalised[..., 0] - normalised[..., 1]
+        spread[..., :self.window - 1] = 0
+        return spread[..., None]
+
+    def reset(self):
+        self._queues = (collections.deque(), collections.deque())
+        self._i = 0
+
+    def update(self, row):
+        maxima = []
+        for queue, price in zip(self._queues, row[:2]):
+            while queue and queue[-1][1] <= price:
+                queue.pop()
+            queue.append((self._i, price))
+            if queue[0][0] <= self._i - self.window:
+                queue.popleft()
+            maxima.append(queue[0][1])
+        self._i += 1
+
+        if self._i < self.window:
+            return np.zeros(1)
+        return np.array([np.log(row[0] / maxima[0]) - np.log(row[1] / maxima[1])])
+
+class SpreadZScore(Feature):
+    """Z-score of the log price ratio against its rolling mean and standard deviation."""
+
+    def batch(self, data):
+        spread = np.log(data[..., 0]) - np.log(data[..., 1])
+        mean, std = rolling_mean_std(spread, self.window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            zscore = (spread - mean) / std
+        return np.where(np.isfinite(zscore), zscore, 0)[..., None]
+
+    def update(self, row):
+        spread = np.log(row[0]) - np.log(row[1])
+        if not self._push(np.array([spread])):
+            return np.zeros(1)
+        mean, std = self._rolling_mean_std()
+        return np.where(std > 0, (spread - mean) / np.where(std > 0, std, 1), 0)
+
+class Volatility(Feature):
+    """Rolling standard deviation of the percentage changes of each stock."""
+    size = 2
+    _buffer_width = 2
+
+    def batch(self, data):
+        _, std = rolling_mean_std(np.swapaxes(data[..., 2:4], -1, -2), self.window)
+        return np.nan_to_num(np.swapaxes(std, -1, -2))
+
+    def update(self, row):
+        if not self._push(row[2:4]):
+            return np.zeros(2)
+        return self._rolling_mean_std()[1]
+
+FEATURES = {
+    'lagged_returns': LaggedReturns,
+    'spread': NormalisedSpread,
+    'zscore': SpreadZScore,
+    'volatility': Volatility,
+}
+
+def make_feature(spec):
+    """Creates a feature from its name, or from a (name, key word arguments) tuple.
+
+    Arguments:
+        spec {str} -- feature name in FEATURES, or (name, dict) tuple
+
+    Returns:
+        Feature -- the feature
+    """
+    if isinstance(spec, Feature):
+        return spec
+    name, kwargs = (spec, {}) if isinstance(spec, str) else spec
+    if name not in FEATURES:
+        raise ValueError(f"Unknown feature {name}")
+    return FEATURES[name](**kwargs)
+
+class FeaturePipeline(object):
+    """Concatenates a list of features into one observation vector."""
+    def __init__(self, features):
+        """Creates a FeaturePipeline instance.
+
+        Arguments:
+            features {list} -- feature specs, see `make_feature`
+        """
+        self.features = [make_feature(spec) for spec in features]
+        self.size = sum(feature.size for feature in self.features)
+
+    def reset(self):
+        for feature in self.features:
+            feature.reset()
+
+    def batch(self, data):
+        """Calculates every feature for every day.
+
+        Arguments:
+            data {numpy.Array} -- data rows, shape (n_days, 4), or with leading axes such as (n_pairs, n_days, 4)
+
+        Returns:
+            numpy.Array -- observations, shape (n_days, size) with the same leading axes
+        """
+        data = np.asarray(data, dtype=np.float64)
+        return np.concatenate([feature.batch(data) for feature in self.features], axis=-1)
+
+    def update(self, row):
+        """Adds a day and calculates every feature for it.
+
+        Arguments:
+            row {numpy.Array} -- data row, shape (4,)
+
+        Returns:
+            numpy.Array -- observation, shape (size,)
+        """
+        row = np.asarray(row, dtype=np.float64)
+        return np.concatenate([feature.update(row) for feature in self.features])
+
+def check_consistency(feature, data):
+    """Compares the batch and incremental implementations of a feature or pipeline.
+
+    Arguments:
+        feature {Feature} -- feature or FeaturePipeline to check
+        data {numpy.Array} -- data rows, shape (n_days, 4)
+
+    Returns:
+        float -- largest absolute difference between the two implementations
+    """
+    batch = feature.batch(data)
+    feature.reset()
+    incremental = np.array([feature.update(row) for row in data])
+    feature.reset()
+    return np.max(np.abs(batch - incremental))
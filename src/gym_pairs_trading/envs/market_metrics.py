@@ -3,7 +3,7 @@ import numpy as np
 class MarketMetrics(object):
     """Calculates market metrics, including normalised log price spread, and the last `days` worth of price changes"""
 
-    def __init__(self, days=5, window_size=20):
+    def __init__(self, days=5, window_size=20, dtype=np.float64):
         """Creates a MarketMetrics instance.
 
         Arguments:
@@ -11,12 +11,14 @@ class MarketMetrics(object):
 
         Keyword Arguments:
             window_size {int} -- window size to calculate normalised price (default: {20})
+            dtype {numpy.dtype} -- precision of the price windows (default: {numpy.float64})
         """
         self.days = days
         self._window_size = window_size
+        self.dtype = dtype
 
-        self.window_1 = np.zeros(self._window_size)
-        self.window_2 = np.zeros(self._window_size)
+        self.window_1 = np.zeros(self._window_size, dtype=self.dtype)
+        self.window_2 = np.zeros(self._window_size, dtype=self.dtype)
 
         self.queue_1 = [0] * self.days
         self.queue_2 = [0] * self.days
@@ -26,8 +28,8 @@ class MarketMetrics(object):
     def reset(self):
         """Resets the market metrics.
         """
-        self.window_1 = np.zeros(self._window_size)
-        self.window_2 = np.zeros(self._window_size)
+        self.window_1 = np.zeros(self._window_size, dtype=self.dtype)
+        self.window_2 = np.zeros(self._window_size, dtype=self.dtype)
 
         self.queue_1 = [0] * self.days
         self.queue_2 = [0] * self.days
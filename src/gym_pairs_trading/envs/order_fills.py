@@ -0,0 +1,209 @@
+"""Fills pending orders for both stocks of a pair inside daily bars.
+
+Bars are arrays whose last axis is [open, high, low, close], such as those from DataSource.ohlc, shape
+(days, 2, 4). Orders are filled conservatively from the bar alone, as the path of prices inside it is unknown:
+
+    limit buy   fills when low <= limit,  at min(open, limit)
+    limit sell  fills when high >= limit, at max(open, limit)
+    stop buy    fills when high >= stop,  at max(open, stop)
+    stop sell   fills when low <= stop,   at min(open, stop)
+    market on close orders always fill, at the close, as TradingSim.buy and TradingSim.sell do
+
+A bar that opens through the order's price fills at the open, as the order price was never traded.
+"""
+
+from enum import Enum
+
+import numpy as np
+
+from .trading_sim import Actions
+
+class OrderType(Enum):
+    MARKET_ON_CLOSE = 0
+    LIMIT = 1
+    STOP = 2
+
+OPEN, HIGH, LOW, CLOSE = range(4)
+
+def fill_prices(bars, side, order_type, price):
+    """Evaluates orders against bars. Arguments broadcast against each other.
+
+    Arguments:
+        bars {numpy.Array} -- bars, shape (..., 4)
+        side {numpy.Array} -- Actions.BUY or Actions.SELL value of each order
+        order_type {numpy.Array} -- OrderType value of each order
+        price {numpy.Array} -- limit or stop price of each order, ignored for market on close orders
+
+    Returns:
+        tuple -- (filled, fill_price) arrays, fill prices are nan where not filled
+    """
+    bars = np.asarray(bars)
+    open_, high, low, close = (bars[..., column] for column in range(4))
+    buy = np.asarray(side) == Actions.BUY.value
+    order_type = np.asarray(order_type)
+    price = np.asarray(price, dtype=bars.dtype)
+
+    # Nan prices, such as missing bars or market orders, never compare as filled
+    with np.errstate(invalid='ignore'):
+        limit_filled = np.where(buy, low <= price, high >= price)
+        stop_filled = np.where(buy, high >= price, low <= price)
+    limit_price = np.where(buy, np.fmin(open_, price), np.fmax(open_, price))
+    stop_price = np.where(buy, np.fmax(open_, price), np.fmin(open_, price))
+
+    is_limit = order_type == OrderType.LIMIT.value
+    is_stop = order_type == OrderType.STOP.value
+    filled = np.where(is_limit, limit_filled, np.where(is_stop, stop_filled, np.isfinite(close)))
+    fill_price = np.where(is_limit, limit_price, np.where(is_stop, stop_price, close))
+    return filled, np.where(filled, fill_price, np.nan)
+
+class OrderBook(object):
+    """Pending orders for the legs of many pairs, such as every pair of a portfolio or every episode of a
+    batched backtest. Orders stay pending until they fill or are cancelled. Orders sharing a group cancel
+    each other when one fills, for example a stop loss and a take profit limit on the same position."""
+
+    def __init__(self, dtype=np.float64):
+        """Creates an empty order book.
+
+        Keyword Arguments:
+            dtype {type} -- precision of prices and quantities (default: {np.float64})
+        """
+        self.dtype = dtype
+        self._next_id = 0
+        self.orders = {
+            'id': np.zeros(0, dtype=np.int64),
+            'pair': np.zeros(0, dtype=np.int64),
+            'leg': np.zeros(0, dtype=np.int8),
+            'side': np.zeros(0, dtype=np.int8),
+            'type': np.zeros(0, dtype=np.int8),
+            'price': np.zeros(0, dtype=dtype),
+            'quantity': np.zeros(0, dtype=dtype),
+            'group': np.zeros(0, dtype=np.int64),
+        }
+
+    def __len__(self):
+        return len(self.orders['id'])
+
+    def submit(self, pair, leg, side, order_type, price=np.nan, quantity=1, group=-1):
+        """Adds orders. Arguments broadcast against each other, so one call can submit an order for
+        every pair.
+
+        Arguments:
+            pair {numpy.Array} -- index of the pair in the bars matched against
+            leg {numpy.Array} -- 0 for stock 1, 1 for stock 2
+            side {numpy.Array} -- Actions.BUY or Actions.SELL value
+            order_type {numpy.Array} -- OrderType value
+
+        Keyword Arguments:
+            price {numpy.Array} -- limit or stop price (default: {np.nan})
+            quantity {numpy.Array} -- number of units (default: {1})
+            group {numpy.Array} -- group of orders cancelled when one fills, -1 for none (default: {-1})
+
+        Returns:
+            numpy.Array -- ids of the new orders
+        """
+        arrays = np.broadcast_arrays(*(np.atleast_1d(value) for value in (pair, leg, side, order_type, price, quantity, group)))
+        n = len(arrays[0])
+        ids = np.arange(self._next_id, self._next_id + n)
+        self._next_id += n
+
+        for (name, column), values in zip(self.orders.items(), [ids] + list(arrays)):
+            self.orders[name] = np.concatenate([column, values.astype(column.dtype)])
+        return ids
+
+    def cancel(self, ids=None, pairs=None):
+        """Removes pending orders by id, or every order of some pairs.
+
+        Keyword Arguments:
+            ids {numpy.Array} -- ids of orders to cancel (default: {None})
+            pairs {numpy.Array} -- pairs to cancel every order of (default: {None})
+        """
+        keep = np.ones(len(self), dtype=bool)
+        if ids is not None:
+            keep &= ~np.isin(self.orders['id'], ids)
+        if pairs is not None:
+            keep &= ~np.isin(self.orders['pair'], pairs)
+        self._keep(keep)
+
+    def _keep(self, keep):
+        for name, column in self.orders.items():
+            self.orders[name] = column[keep]
+
+    def match(self, bars):
+        """Fills pending orders against one bar of every pair, and removes them with the rest of their group.
+        When several orders of a group fill in the same bar, stops are taken first, as the bar cannot show
+        which price was reached first.
+
+        Arguments:
+            bars {numpy.Array} -- bars of both legs of every pair, shape (n_pairs, 2, 4)
+
+        Returns:
+            dict -- columns of the filled orders, as in `orders`, with the fill price as 'price'
+        """
+        orders = self.orders
+        bars = np.asarray(bars)
+        filled, fill_price = fill_prices(bars[orders['pair'], orders['leg']], orders['side'], orders['type'], orders['price'])
+
+        # Keep one fill per group: stops first, then the earliest order
+        grouped = np.flatnonzero(filled & (orders['group'] >= 0))
+        if len(grouped):
+            priority = np.lexsort((orders['id'][grouped], orders['type'][grouped] != OrderType.STOP.value,
+                orders['group'][grouped]))
+            _, first = np.unique(orders['group'][grouped][priority], return_index=True)
+            filled[grouped] = False
+            filled[grouped[priority[first]]] = True
+
+        fills = {name: column[filled] for name, column in orders.items()}
+        fills['price'] = fill_price[filled].astype(self.dtype)
+
+        done_groups = fills['group'][fills['group'] >= 0]
+        self._keep(~filled & ~np.isin(orders['group'], done_groups))
+        return fills
+
+def cash_flows(fills, transaction_fee=0):
+    """Cash paid for or received from fills, with the fee per order of TradingSim.
+
+    Arguments:
+        fills {dict} -- fills from OrderBook.match
+
+    Keyword Arguments:
+        transaction_fee {float} -- cost of each filled order (default: {0})
+
+    Returns:
+        numpy.Array -- change in cash of each fill
+    """
+    direction = np.where(fills['side'] == Actions.BUY.value, -1, 1)
+    return direction * fills['price'] * fills['quantity'] - transaction_fee
+
+
+if __name__=='__main__':
+    from .synthetic_data import SyntheticPairGenerator
+
+    # Bracket orders on the first stock of many pairs: buy 1% under the close, then sell with a 2% stop
+    # loss or a 2% take profit, whichever the bars reach first
+    chunk = SyntheticPairGenerator(n_pairs=1000, seed=0).next_chunk(250)
+    bars = np.stack([chunk[name] for name in ('open', 'high', 'low', 'close')], axis=-1).transpose(1, 0, 2, 3)
+    n_pairs = bars.shape[1]
+
+    book = OrderBook()
+    holding = np.zeros(n_pairs, dtype=bool)
+    waiting = np.zeros(n_pairs, dtype=bool)
+    cash = np.zeros(n_pairs)
+    n_trades = 0
+    for day in range(1, len(bars)):
+        entries = np.flatnonzero(~holding & ~waiting)
+        book.submit(entries, 0, Actions.BUY.value, OrderType.LIMIT.value, bars[day - 1, entries, 0, CLOSE] * 0.99)
+        waiting[entries] = True
+
+        fills = book.match(bars[day])
+        np.add.at(cash, fills['pair'], cash_flows(fills))
+        bought = fills['pair'][fills['side'] == Actions.BUY.value]
+        sold = fills['pair'][fills['side'] == Actions.SELL.value]
+        holding[bought] = True
+        holding[sold] = waiting[sold] = False
+        n_trades += len(sold)
+
+        entry_prices = fills['price'][fills['side'] == Actions.BUY.value]
+        book.submit(bought, 0, Actions.SELL.value, OrderType.STOP.value, entry_prices * 0.98, group=bought)
+        book.submit(bought, 0, Actions.SELL.value, OrderType.LIMIT.value, entry_prices * 1.02, group=bought)
+
+    print(f"{n_trades} round trips, mean cash flow per pair {np.mean(cash):.2f}, {len(book)} orders pending")
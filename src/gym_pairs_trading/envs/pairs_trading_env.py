@@ -3,13 +3,15 @@ from gym import error, spaces, utils
 from gym.utils import seeding
 import numpy as np
 
-from .data_source import DataSource
+from .data_source import DataSource, PRECISIONS
 from .trading_sim import TradingSim, TradingSimV2, Actions, Status
 from .market_metrics import MarketMetrics
+from .rewards import make_reward
+from .features import FeaturePipeline
 
 import matplotlib.pyplot as plt
 
-sign = lambda x: x and (1, -1)[x < 0]
+sign = lambda x: x and (1, -1)[int(x < 0)]
 
 class PairsTradingEnv(gym.Env):
     metadata = {'render.modes': ['human', 'console']}
@@ -31,21 +33,37 @@ class PairsTradingEnv(gym.Env):
                 Other values are not legal.
 
         Key Word Arguments:
-            None
+            data_source {iterable} -- object with the DataSource iteration interface to use instead of
+                downloading `data_1` and `data_2`, such as a SyntheticDataSource (default: None)
+            reward_mode {str} -- reward function, one of 'return', 'log_return', 'differential_sharpe',
+                'drawdown' or 'turnover' (default: 'return')
+            reward_kwargs {dict} -- arguments of the reward function, such as `eta` (default: {})
+            precision {str} -- 'float64' or 'float32', the precision of prices and observations. Cash and
+                net asset values are always float64 (default: 'float64')
+            features {list} -- feature specs, see features.make_feature, to build observations from instead
+                of the last `days` percentage changes and the spread (default: None)
+            Any other key word argument is passed to DataSource.
         """
 
         self.spread_status = spread_status
+        self.dtype = PRECISIONS[kwargs.get('precision', 'float64')]
+        self.feature_pipeline = FeaturePipeline(kwargs['features']) if kwargs.get('features') else None
+        n_features = self.feature_pipeline.size if self.feature_pipeline else days*2+1
         self.action_space = spaces.Discrete(3)
         self.observation_space = spaces.Box(
             low=-1,
             high=1,
-            shape=(days*2+1+self.spread_status,)
+            shape=(n_features+self.spread_status,),
+            dtype=self.dtype
         )
 
         super(PairsTradingEnv, self).__init__()
-        self.data_source = DataSource(data_1, data_2, **kwargs)
+        self.data_source = kwargs.get('data_source')
+        if self.data_source is None:
+            self.data_source = DataSource(data_1, data_2, **kwargs)
         self.trading_sim = TradingSim()
-        self.market_metrics = MarketMetrics(days)
+        self.market_metrics = MarketMetrics(days, dtype=self.dtype)
+        self.reward_function = make_reward(kwargs.get('reward_mode', 'return'), **kwargs.get('reward_kwargs', {}))
         self.trading_day = 0
         self.previous_balance = self.trading_sim.balance
         self.portfolio_value = self.trading_sim.balance
@@ -74,6 +92,9 @@ class PairsTradingEnv(gym.Env):
         self.data_source.reset()
         self.trading_sim.reset()
         self.market_metrics.reset()
+        self.reward_function.reset()
+        if self.feature_pipeline:
+            self.feature_pipeline.reset()
 
         self.trading_day = 1
         self.previous_balance = self.trading_sim.balance
@@ -87,20 +108,44 @@ class PairsTradingEnv(gym.Env):
 
         spread, data_ready = self.market_metrics.update(s1_price, s2_price)
         stock_1_changes, stock_2_changes = self.market_metrics.update_percentage(s1_pct, s2_pct)
+        features = self._update_features(data)
         while not data_ready:
             date, data = next(self.data_source)
             s1_price, s2_price, s1_pct, s2_pct = data
 
             spread, data_ready = self.market_metrics.update(s1_price, s2_price)
+            features = self._update_features(data)
             self.trading_day += 1
 
-        if self.spread_status == 0:
-            obs = np.array(stock_1_changes+stock_2_changes+[spread])
-        elif self.spread_status == 1:
-            obs = np.array(stock_1_changes+stock_2_changes+[spread, self.trading_sim.status.value])
-        else:
-            obs = np.array(stock_1_changes+stock_2_changes+[spread, self.trading_sim.status.value, 0])
-        return obs
+        if features is None:
+            features = stock_1_changes+stock_2_changes+[spread]
+        return self._get_obs(features, 0)
+
+    def _update_features(self, data):
+        """Adds a data row to the feature pipeline
+
+        Arguments:
+            data {numpy.Array} -- data row
+
+        Returns:
+            numpy.Array -- features, or None when observations are not built from a feature list
+        """
+        if self.feature_pipeline:
+            return self.feature_pipeline.update(data)
+        return None
+
+    def _get_obs(self, features, spread_inverted):
+        """Builds an observation from features and as much of the spread status as is considered
+
+        Arguments:
+            features {list} -- feature values
+            spread_inverted {int} -- if the spread value inverted since buying
+
+        Returns:
+            numpy.Array -- observation
+        """
+        status = [self.trading_sim.status.value, spread_inverted][:self.spread_status]
+        return np.array(list(features)+status, dtype=self.dtype)
 
     def skip_forward(self, days):
         """Skip forward a number of days in the envirnoment. Will fail if end of dataset.
@@ -117,7 +162,8 @@ class PairsTradingEnv(gym.Env):
                 s1_price, s2_price, s1_pct, s2_pct = data
                 self.market_metrics.update(s1_price, s2_price)
                 self.market_metrics.update_percentage(s1_pct, s2_pct)
-                self.previous_balance = self.trading_sim.get_NAV(s1_price, s2_price)
+                self._update_features(data)
+                self.previous_balance = self.trading_sim.get_NAV(float(s1_price), float(s2_price))
                 self.trading_day += 1
             return True
         except StopIteration:
@@ -126,6 +172,15 @@ class PairsTradingEnv(gym.Env):
     def get_portfolio_value(self):
         return self.portfolio_value
 
+    def set_data_source(self, data_source):
+        """Switches the environment to another pair's data, for example one loaded by a PairPrefetcher.
+        The environment needs to be reset before stepping.
+
+        Arguments:
+            data_source {iterable} -- object with the DataSource iteration interface
+        """
+        self.data_source = data_source
+
     def step(self, action, penalty):
         """Perform a set in the environment
 
@@ -153,24 +208,27 @@ class PairsTradingEnv(gym.Env):
 
         spread, _ = self.market_metrics.update(s1_price, s2_price)
         stock_1_changes, stock_2_changes = self.market_metrics.update_percentage(s1_pct, s2_pct)
+        features = self._update_features(data)
+        if features is None:
+            features = stock_1_changes+stock_2_changes+[spread]
+
+        # Cash and net asset values are float64 whatever the precision of the data, as in PortfolioTradingEnv
+        s1_price, s2_price = float(s1_price), float(s2_price)
 
         spread_inverted = 0
         if self.trading_sim.status == Status.INVESTED_IN_SPREAD:
             if sign(self.trading_sim.spread_when_bought) != sign(spread):
                 spread_inverted = 1
 
+        position = self.trading_sim.get_position()
         self.trading_sim.execute(action, spread, s1_price, s2_price, penalty)
+        turnover = abs(self.trading_sim.get_position() - position)
 
         self.trading_day += 1
-        if self.spread_status == 0:
-            obs = np.array(stock_1_changes+stock_2_changes+[spread])
-        elif self.spread_status == 1:
-            obs = np.array(stock_1_changes+stock_2_changes+[spread, self.trading_sim.status.value])
-        else:
-            obs = np.array(stock_1_changes+stock_2_changes+[spread, self.trading_sim.status.value, spread_inverted])
+        obs = self._get_obs(features, spread_inverted)
         balance = self.trading_sim.get_NAV(s1_price, s2_price)
         self.portfolio_value = self.trading_sim.get_NAV(s1_price, s2_price)
-        reward = balance / self.previous_balance - 1 # Subtract 1 to centre at 0
+        reward = float(self.reward_function(balance, self.previous_balance, turnover))
 
         if action == Actions.BUY.value:
             self.render_data['buy'].append((self.trading_day, balance))
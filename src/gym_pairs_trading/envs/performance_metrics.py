@@ -0,0 +1,240 @@
+import gym
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+class StreamingMetrics(object):
+    """Calculates risk and performance metrics of a portfolio one step at a time. Only running sums are kept,
+    using Welford's algorithm for variances and a running peak for drawdowns, so every update costs the same
+    regardless of episode length. All state is held in arrays, so one instance can score a batch of episodes.
+
+    Positions are signed exposures, for example 1 when holding stock 1, -1 when holding stock 2 and 0 when out
+    of the spread. A trade starts when the position leaves 0 and ends when it returns to 0 or changes sign.
+    """
+    def __init__(self, n_episodes=None, periods_per_year=TRADING_DAYS_PER_YEAR):
+        """Creates a StreamingMetrics instance.
+
+        Keyword Arguments:
+            n_episodes {int} -- number of episodes tracked at once, None for a single episode (default: {None})
+            periods_per_year {int} -- number of steps per year, used to annualise (default: {252})
+        """
+        self.shape = () if n_episodes is None else (n_episodes,)
+        self.periods_per_year = periods_per_year
+        self.reset(np.ones(self.shape))
+
+    def reset(self, nav, position=0):
+        """Resets the metrics to the start of an episode.
+
+        Arguments:
+            nav {float} -- starting net asset value
+
+        Keyword Arguments:
+            position {float} -- starting position (default: {0})
+        """
+        zeros = lambda: np.zeros(self.shape)
+
+        self.start_nav = np.broadcast_to(np.asarray(nav, dtype=np.float64), self.shape).copy()
+        self.nav = self.start_nav.copy()
+        self.peak = self.start_nav.copy()
+        self.position = np.broadcast_to(np.asarray(position, dtype=np.float64), self.shape).copy()
+
+        self.steps = 0
+        self.mean_return = zeros()
+        self._return_m2 = zeros()
+        self._downside_sum = zeros()
+        self.max_drawdown = zeros()
+        self._turnover_sum = zeros()
+
+        self.n_trades = zeros()
+        self.n_wins = zeros()
+        self.mean_holding_period = zeros()
+        self._holding_m2 = zeros()
+        self.max_holding_period = zeros()
+        self._entry_nav = self.start_nav.copy()
+        self._entry_step = zeros()
+
+    def update(self, nav, position):
+        """Adds one step to the metrics.
+
+        Arguments:
+            nav {float} -- net asset value after the step
+            position {float} -- position after the step
+        """
+        nav = np.asarray(nav, dtype=np.float64)
+        position = np.asarray(position, dtype=np.float64)
+        self.steps += 1
+
+        step_return = nav / self.nav - 1
+        delta = step_return - self.mean_return
+        self.mean_return = self.mean_return + delta / self.steps
+        self._return_m2 = self._return_m2 + delta * (step_return - self.mean_return)
+        self._downside_sum = self._downside_sum + np.minimum(step_return, 0) ** 2
+
+        self.peak = np.maximum(self.peak, nav)
+        self.max_drawdown = np.maximum(self.max_drawdown, 1 - nav / self.peak)
+        self._turnover_sum = self._turnover_sum + np.abs(position - self.position)
+
+        was_invested = self.position != 0
+        exits = was_invested & (np.sign(position) != np.sign(self.position))
+        entries = (position != 0) & (~was_invested | exits)
+
+        holding_period = self.steps - self._entry_step
+        self.n_trades = self.n_trades + exits
+        self.n_wins = self.n_wins + (exits & (nav > self._entry_nav))
+        holding_delta = np.where(exits, holding_period - self.mean_holding_period, 0)
+        self.mean_holding_period = self.mean_holding_period + \
+            np.where(exits, holding_delta / np.maximum(self.n_trades, 1), 0)
+        self._holding_m2 = self._holding_m2 + holding_delta * (holding_period - self.mean_holding_period)
+        self.max_holding_period = np.where(exits, np.maximum(self.max_holding_period, holding_period),
+            self.max_holding_period)
+
+        self._entry_nav = np.where(entries, nav, self._entry_nav)
+        self._entry_step = np.where(entries, self.steps, self._entry_step)
+
+        self.nav = nav
+        self.position = position
+
+    def metrics(self):
+        """Returns the metrics of the steps seen so far. Undefined metrics, such as the hit rate before any
+        trade is closed, are NaN.
+
+        Returns:
+            dict -- metric name to value, arrays of shape (n_episodes,) for batches
+        """
+        return _summarise(
+            self.steps, self.nav / self.start_nav, self.mean_return,
+            self._return_m2, self._downside_sum, self.max_drawdown, self._turnover_sum,
+            self.n_trades, self.n_wins, self.mean_holding_period, self._holding_m2,
+            self.max_holding_period, self.periods_per_year
+        )
+
+
+def compute_metrics(nav, positions=None, periods_per_year=TRADING_DAYS_PER_YEAR):
+    """Calculates the same metrics as StreamingMetrics from whole net asset value histories.
+
+    Arguments:
+        nav {numpy.Array} -- net asset values, the last axis is time, shape (..., steps + 1)
+
+    Keyword Arguments:
+        positions {numpy.Array} -- positions, same shape as `nav`. Trade metrics need positions (default: {None})
+        periods_per_year {int} -- number of steps per year, used to annualise (default: {252})
+
+    Returns:
+        dict -- metric name to value, arrays of shape nav.shape[:-1] for batches
+    """
+    nav = np.asarray(nav, dtype=np.float64)
+    if positions is None:
+        positions = np.zeros_like(nav)
+    positions = np.asarray(positions, dtype=np.float64)
+    steps = nav.shape[-1] - 1
+
+    returns = nav[..., 1:] / nav[..., :-1] - 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_return = returns.sum(axis=-1) / steps
+    return_m2 = np.sum((returns - mean_return[..., None]) ** 2, axis=-1)
+    downside_sum = np.sum(np.minimum(returns, 0) ** 2, axis=-1)
+
+    peak = np.maximum.accumulate(nav, axis=-1)
+    max_drawdown = np.max(1 - nav / peak, axis=-1)
+    turnover_sum = np.sum(np.abs(np.diff(positions, axis=-1)), axis=-1)
+
+    was_invested = positions[..., :-1] != 0
+    exits = was_invested & (np.sign(positions[..., 1:]) != np.sign(positions[..., :-1]))
+    entries = (positions != 0)
+    entries[..., 1:] &= ~was_invested | exits
+
+    days = np.arange(nav.shape[-1])
+    last_entry = np.maximum.accumulate(np.where(entries, days, 0), axis=-1)[..., :-1]
+    holding_periods = days[1:] - last_entry
+    trade_wins = nav[..., 1:] > np.take_along_axis(nav, last_entry, axis=-1)
+
+    n_trades = exits.sum(axis=-1)
+    n_wins = (exits & trade_wins).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_holding_period = np.where(n_trades > 0,
+            np.sum(holding_periods * exits, axis=-1) / n_trades, 0)
+    holding_m2 = np.sum(exits * (holding_periods - mean_holding_period[..., None]) ** 2, axis=-1)
+    max_holding_period = np.max(holding_periods * exits, axis=-1, initial=0)
+
+    return _summarise(
+        steps, nav[..., -1] / nav[..., 0], mean_return, return_m2, downside_sum, max_drawdown,
+        turnover_sum, n_trades, n_wins, mean_holding_period, holding_m2, max_holding_period,
+        periods_per_year
+    )
+
+
+def _summarise(steps, growth, mean_return, return_m2, downside_sum, max_drawdown, turnover_sum,
+        n_trades, n_wins, mean_holding_period, holding_m2, max_holding_period, periods_per_year):
+    """Turns running sums into metrics.
+
+    Returns:
+        dict -- metric name to value
+    """
+    # Before any step every rate is undefined, and Python division by zero would raise
+    undefined = lambda value: np.full_like(value, np.nan, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        volatility = np.sqrt(return_m2 / (steps - 1)) if steps > 1 else undefined(return_m2)
+        downside_deviation = np.sqrt(downside_sum / steps) if steps > 0 else undefined(downside_sum)
+        annualised_return = growth ** (periods_per_year / steps) - 1 if steps > 0 else undefined(growth)
+        turnover = turnover_sum / steps if steps > 0 else undefined(turnover_sum)
+        return {
+            'total_return': growth - 1,
+            'annualised_return': annualised_return,
+            'volatility': volatility * np.sqrt(periods_per_year),
+            'sharpe': mean_return / volatility * np.sqrt(periods_per_year),
+            'sortino': mean_return / downside_deviation * np.sqrt(periods_per_year),
+            'max_drawdown': max_drawdown,
+            'calmar': annualised_return / max_drawdown,
+            'turnover': turnover,
+            'n_trades': n_trades,
+            'hit_rate': n_wins / n_trades,
+            'mean_holding_period': np.where(n_trades > 0, mean_holding_period, np.nan),
+            'std_holding_period': np.where(n_trades > 1, np.sqrt(holding_m2 / (n_trades - 1)), np.nan),
+            'max_holding_period': np.where(n_trades > 0, max_holding_period, np.nan),
+        }
+
+
+class MetricsWrapper(gym.Wrapper):
+    """Scores a PairsTradingEnv episode while it runs. The metrics are added to the info dictionary as
+    `metrics` when the episode is done, and are available at any time from `get_metrics`."""
+
+    def __init__(self, env, periods_per_year=TRADING_DAYS_PER_YEAR):
+        """Wraps an environment.
+
+        Arguments:
+            env {PairsTradingEnv} -- environment to score
+
+        Keyword Arguments:
+            periods_per_year {int} -- number of steps per year, used to annualise (default: {252})
+        """
+        super(MetricsWrapper, self).__init__(env)
+        self.streaming_metrics = StreamingMetrics(periods_per_year=periods_per_year)
+
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        self.streaming_metrics.reset(self.env.portfolio_value, self.env.trading_sim.get_position())
+        return obs
+
+    def step(self, action, *args, **kwargs):
+        obs, reward, done, info = self.env.step(action, *args, **kwargs)
+        if done:
+            info['metrics'] = self.get_metrics()
+        else:
+            self.streaming_metrics.update(self.env.portfolio_value, self.env.trading_sim.get_position())
+        return obs, reward, done, info
+
+    def get_metrics(self):
+        """Returns the metrics of the current episode so far.
+
+        Returns:
+            dict -- metric name to value
+        """
+        return {name: value.item() for name, value in self.streaming_metrics.metrics().items()}
+
+
+if __name__=='__main__':
+    rng = np.random.default_rng(0)
+    nav = 10000 * np.cumprod(1 + rng.normal(0.0005, 0.01, (4, 1000)), axis=1)
+    positions = (rng.random((4, 1000)) < 0.5).astype(float)
+    for name, value in compute_metrics(nav, positions).items():
+        print(name, value)
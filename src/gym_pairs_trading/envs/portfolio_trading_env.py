@@ -0,0 +1,259 @@
+import warnings
+
+import gym
+from gym import spaces
+from gym.utils import seeding
+import numpy as np
+
+from .data_source import ArrayDataSource, PRECISIONS
+from .features import LaggedReturns, NormalisedSpread
+from .rewards import make_reward
+from .trading_sim import Actions, Status
+
+class PortfolioTradingEnv(gym.Env):
+    """Trades K pairs over a common date index from one cash account. Every pair follows the rules of
+    TradingSim, buying the cheaper stock of the spread and selling it again, but all K pairs are stepped
+    together with array operations."""
+    metadata = {'render.modes': ['console']}
+
+    def __init__(self, data, days=5, window_size=20, **kwargs):
+        """Initializes the PortfolioTradingEnv.
+
+        Arguments:
+            data {numpy.Array} -- rows of [stock 1 close, stock 2 close, stock 1 percent change,
+                stock 2 percent change] for every pair and day, shape (n_days, n_pairs, 4)
+
+        Keyword Arguments:
+            days {int} -- the number of days of percentage changes in the observation (default: {5})
+            window_size {int} -- window size to calculate normalised prices, as in MarketMetrics (default: {20})
+
+        Key Word Arguments:
+            dates {list} -- date of each row (default: trading day numbers)
+            start_balance {float} -- starting cash balance (default: 10000 per pair)
+            transaction_fee {float} -- how much it costs to perform a trade (default: 10)
+            allocation {float} -- fraction of the net asset value put into each new position, reduced
+                when there is not enough cash (default: 1 / n_pairs)
+            reward_mode {str} -- reward function, as for PairsTradingEnv. Turnover is the fraction of
+                pairs entering or leaving the spread (default: 'return')
+            reward_kwargs {dict} -- arguments of the reward function, such as `eta` (default: {})
+            precision {str} -- 'float64' or 'float32', the precision of prices, spreads and observations.
+                Cash and net asset values are always float64 (default: 'float64')
+        """
+        super(PortfolioTradingEnv, self).__init__()
+
+        self.dtype = PRECISIONS[kwargs.get('precision', 'float64')]
+        self.data = np.asarray(data, dtype=self.dtype)
+        self.n_days, self.n_pairs = self.data.shape[:2]
+        self.days = days
+        self.window_size = window_size
+
+        self.dates = kwargs.get('dates')
+        if self.dates is None:
+            self.dates = range(self.n_days)
+        self.start_balance = kwargs.get('start_balance', 10000 * self.n_pairs)
+        self.transaction_fee = kwargs.get('transaction_fee', 10)
+        self.allocation = kwargs.get('allocation', 1 / self.n_pairs)
+
+        first_prices = self.data[min(window_size, self.n_days) - 1, :, :2]
+        if self.allocation * self.start_balance < self.transaction_fee + np.median(first_prices):
+            warnings.warn(f"Each position starts with {self.allocation * self.start_balance:.2f} of cash, which "
+                f"does not cover the transaction fee and one share of the median priced stock. Raise "
+                f"start_balance or allocation, or most pairs will never be entered")
+        self.reward_function = make_reward(kwargs.get('reward_mode', 'return'), **kwargs.get('reward_kwargs', {}))
+
+        self.action_space = spaces.MultiDiscrete([len(Actions)] * self.n_pairs)
+        self.observation_space = spaces.Box(
+            low=-1,
+            high=1,
+            shape=(self.n_pairs, days*2+2),
+            dtype=self.dtype
+        )
+
+        self.lagged_returns = LaggedReturns(days)
+        # The MarketMetrics spread of every pair and day, zero until the window is full, shape (n_days, n_pairs)
+        self.spreads = NormalisedSpread(window_size).batch(self.data.transpose(1, 0, 2))[:, :, 0].T
+
+        self.reset()
+
+    @classmethod
+    def from_data_sources(cls, data_sources, **kwargs):
+        """Creates an environment from one data source per pair, keeping only the dates all pairs share.
+
+        Arguments:
+            data_sources {list} -- data sources with the DataSource interface
+
+        Returns:
+            PortfolioTradingEnv -- the environment
+        """
+        arrays = [ArrayDataSource.from_data_source(data_source) for data_source in data_sources]
+
+        common_dates = set(arrays[0].dates)
+        for array in arrays[1:]:
+            common_dates &= set(array.dates)
+        dates = [date for date in arrays[0].dates if date in common_dates]
+
+        rows = []
+        for array in arrays:
+            index = {date: i for i, date in enumerate(array.dates)}
+            rows.append(array.data[[index[date] for date in dates]])
+
+        return cls(np.stack(rows, axis=1), dates=dates, **kwargs)
+
+    def seed(self, seed=None):
+        """Sets a seed for the envirnoment
+
+        Keyword Arguments:
+            seed {any} -- seed value (default: {None})
+
+        Returns:
+            [[seed]] -- seed value in array
+        """
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset(self):
+        """Resets the environment to the first day with a full spread window
+
+        Returns:
+            numpy.Array -- Initial observations from environment
+        """
+        self.trading_day = self.window_size - 1
+
+        self.balance = float(self.start_balance)
+        self.stock_balances = np.zeros((self.n_pairs, 2))
+        self.invested = np.zeros(self.n_pairs, dtype=bool)
+        self.spread_when_bought = np.zeros(self.n_pairs)
+
+        self.portfolio_value = self.balance
+        self.previous_balance = self.balance
+        self.reward_function.reset()
+
+        return self._observation()
+
+    def get_NAV(self):
+        """Gets the Net Asset Value of the portolio at the current trading day
+
+        Returns:
+            float -- net asset value
+        """
+        prices = self.data[self.trading_day, :, :2]
+        return self.balance + np.sum(self.stock_balances * prices, dtype=np.float64)
+
+    def get_portfolio_value(self):
+        return self.portfolio_value
+
+    def step(self, action, penalty=1):
+        """Perform a step in the environment
+
+        Arguments:
+            action {numpy.Array} -- One of Action enum values for every pair
+
+        Keyword Arguments:
+            penalty {float} -- the cash balance is rescaled by this value for every illegal action,
+                buying an invested pair or selling a pair that is not invested (default: {1})
+
+        Returns:
+            tuple -- (obs, reward, done, info) implementation of gym
+        """
+        if self.trading_day + 1 >= self.n_days:
+            obs = np.zeros(self.observation_space.shape, dtype=self.dtype)
+            return obs, 0, 1, {}
+        self.trading_day += 1
+
+        action = np.asarray(action)
+        buy = action == Actions.BUY.value
+        sell = action == Actions.SELL.value
+
+        prices = self.data[self.trading_day, :, :2]
+        spread = self.spreads[self.trading_day]
+
+        was_invested = self.invested.copy()
+        n_illegal = np.count_nonzero(buy & self.invested) + np.count_nonzero(sell & ~self.invested)
+        self.spread_when_bought = np.where(buy, spread, self.spread_when_bought)
+
+        # Sell every leg held by pairs leaving the spread
+        exits = sell & self.invested
+        self.balance += np.sum(self.stock_balances[exits] * prices[exits]) - \
+            self.transaction_fee * np.count_nonzero(exits)
+        self.stock_balances[exits] = 0
+        self.invested &= ~exits
+
+        self.balance *= penalty ** n_illegal
+
+        # Buy the cheaper stock of pairs entering the spread, splitting cash when it runs short
+        entries = np.flatnonzero(buy & ~self.invested)
+        if len(entries):
+            legs = (spread[entries] >= 0).astype(int)
+            entry_prices = prices[entries, legs]
+
+            budget = min(self.allocation * self.get_NAV(), self.balance / len(entries))
+            units = np.maximum((budget - self.transaction_fee) // entry_prices, 0)
+            bought = units > 0
+
+            self.stock_balances[entries[bought], legs[bought]] = units[bought]
+            self.invested[entries[bought]] = True
+            self.balance -= np.sum(units * entry_prices) + self.transaction_fee * np.count_nonzero(bought)
+
+        balance = self.get_NAV()
+        self.portfolio_value = balance
+        turnover = np.count_nonzero(self.invested != was_invested) / self.n_pairs
+        reward = float(self.reward_function(balance, self.previous_balance, turnover))
+        self.previous_balance = balance
+
+        info = {
+            "date": self.dates[self.trading_day],
+            "trading_day": self.trading_day,
+            "portfolio_value": balance
+        }
+        return self._observation(), reward, 0, info
+
+    def _observation(self):
+        """Builds the observation of every pair: the last `days` percentage changes of both stocks,
+        most recent first, the spread and the Status value.
+
+        Returns:
+            numpy.Array -- observations, shape (n_pairs, days*2+2)
+        """
+        t = self.trading_day
+        # Only the last `days` rows are needed for the lags of day t
+        recent = self.data[max(t - self.days + 1, 0):t + 1].transpose(1, 0, 2)
+        changes = self.lagged_returns.batch(recent)[:, -1]
+        status = np.where(self.invested, Status.INVESTED_IN_SPREAD.value, Status.OUT_OF_SPREAD.value).astype(self.dtype)
+        return np.concatenate([
+            changes,
+            self.spreads[t][:, None],
+            status[:, None]
+        ], axis=1)
+
+    def render(self, mode='console'):
+        """Render the current environment
+
+        Keyword Arguments:
+            mode {str} -- Which mode to render as (default: {'console'})
+        """
+        if mode=='console':
+            print(f"Trading day: {self.trading_day}. Portfolio Value: {self.portfolio_value}. " \
+                f"Pairs invested: {np.count_nonzero(self.invested)}/{self.n_pairs}")
+        else:
+            print("Invalid render mode")
+
+
+if __name__=='__main__':
+    import time
+
+    from .synthetic_data import SyntheticPairGenerator
+
+    chunk = SyntheticPairGenerator(n_pairs=500, seed=0).next_chunk(1000)
+    closes = chunk['adjusted_close'].transpose(1, 0, 2)
+    opens = closes * chunk['open'].transpose(1, 0, 2) / chunk['close'].transpose(1, 0, 2)
+    data = np.concatenate([closes, (closes - opens) / opens], axis=2)
+
+    env = PortfolioTradingEnv(data, dates=chunk['date'])
+    env.reset()
+    rng = np.random.default_rng(0)
+    start = time.time()
+    done = False
+    while not done:
+        _, _, done, _ = env.step(rng.integers(0, 3, env.n_pairs))
+    print(f"{env.trading_day} steps of {env.n_pairs} pairs in {time.time() - start:.2f}s")
+    env.render()
@@ -0,0 +1,186 @@
+import collections
+import itertools
+import threading
+
+import numpy as np
+
+from .data_source import DataSource, ArrayDataSource
+
+class PairPrefetcher(object):
+    """Loads stock pairs in a background thread while the current pair is being used. Every pair is read into
+    an ArrayDataSource, so once it is handed over an environment can switch to it without any loading.
+
+    At most `max_prefetch` pairs are held ready. The memory of a pair counts every array it holds after
+    `prepare`, including computed features. A pair is only loaded when the ready pairs leave room in
+    `memory_budget` for a pair as large as the last one loaded, so with similar sized pairs no more than the
+    budget is held, counting the pair being loaded.
+    """
+    def __init__(self, pairs, loader=None, max_prefetch=2, memory_budget=None, **kwargs):
+        """Creates a PairPrefetcher instance and starts loading.
+
+        Arguments:
+            pairs {list} -- (symbol_1, symbol_2) tuples, loaded in order
+
+        Keyword Arguments:
+            loader {callable} -- called with both symbols to create a data source (default: DataSource)
+            max_prefetch {int} -- maximum number of pairs held ready (default: {2})
+            memory_budget {int} -- maximum bytes of data held ready, None for no limit (default: {None})
+
+        Key Word Arguments:
+            cycle {bool} -- whether to start again from the first pair after the last one (default: False)
+            prepare {callable} -- called in the background with every ArrayDataSource, for example to
+                compute features. Its return value is handed over instead (default: None)
+            Any other key word argument is passed to DataSource.
+        """
+        cycle = kwargs.pop('cycle', False)
+        self.prepare = kwargs.pop('prepare', None)
+        self.loader = loader or (lambda symbol_1, symbol_2: DataSource(symbol_1, symbol_2, **kwargs))
+        self.max_prefetch = max_prefetch
+        self.memory_budget = memory_budget
+
+        self._pairs = itertools.cycle(pairs) if cycle else iter(pairs)
+        self._ready = collections.deque()
+        self._ready_bytes = 0
+        self._last_nbytes = 0
+        self._finished = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _has_room(self, nbytes):
+        """Whether a pair of `nbytes` can be added to the ready pairs. A pair is always accepted when
+        nothing is ready, so a pair larger than the budget cannot block loading forever.
+        """
+        if len(self._ready) >= self.max_prefetch:
+            return False
+        if self.memory_budget is not None and self._ready:
+            return self._ready_bytes + nbytes <= self.memory_budget
+        return True
+
+    def _run(self):
+        """Background loop loading pairs until every pair is loaded or the prefetcher is closed.
+        """
+        for pair in self._pairs:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._has_room(self._last_nbytes))
+                if self._closed:
+                    return
+
+            try:
+                source = ArrayDataSource.from_data_source(self.loader(*pair))
+                prepared = self.prepare(source) if self.prepare else source
+                nbytes = _nbytes(prepared)
+                item = (pair, prepared, None)
+            except Exception as e:
+                nbytes = 0
+                item = (pair, None, e)
+
+            with self._condition:
+                # A pair larger than the last one may still not fit
+                self._condition.wait_for(lambda: self._closed or self._has_room(nbytes))
+                if self._closed:
+                    return
+                self._ready.append(item + (nbytes,))
+                self._ready_bytes += nbytes
+                # A failed load says nothing about the size of the next pair
+                if item[2] is None:
+                    self._last_nbytes = nbytes
+                self._condition.notify_all()
+
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def next_source(self, timeout=None):
+        """Returns the next loaded pair, waiting for it if it is not ready yet.
+
+        Keyword Arguments:
+            timeout {float} -- seconds to wait, None to wait until loaded (default: {None})
+
+        Raises:
+            StopIteration: When every pair has been returned, or the prefetcher is closed
+            TimeoutError: When the pair was not loaded in time
+            Exception: Any error raised while loading the pair
+
+        Returns:
+            tuple -- ((symbol_1, symbol_2), ArrayDataSource)
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._ready or self._finished or self._closed, timeout):
+                raise TimeoutError("Pair was not loaded in time")
+            if self._closed or not self._ready:
+                raise StopIteration
+            pair, source, error, nbytes = self._ready.popleft()
+            self._ready_bytes -= nbytes
+            self._condition.notify_all()
+
+        if error is not None:
+            raise error
+        return pair, source
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next_source()
+
+    @property
+    def ready_bytes(self):
+        """Bytes of arrays currently held ready, including prepared features
+        """
+        return self._ready_bytes
+
+    def close(self):
+        """Stops loading pairs. Pairs not yet returned are dropped.
+        """
+        with self._condition:
+            self._closed = True
+            self._ready.clear()
+            self._ready_bytes = 0
+            self._condition.notify_all()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _nbytes(value, seen=None):
+    """Bytes of the numpy arrays held by a value, looking inside containers and object attributes.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(item, seen) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item, seen) for item in value)
+    if hasattr(value, '__dict__'):
+        return sum(_nbytes(item, seen) for item in vars(value).values())
+    return 0
+
+
+if __name__=='__main__':
+    import time
+
+    from .synthetic_data import SyntheticDataSource
+    from .pairs_trading_env import PairsTradingEnv
+
+    pairs = [(seed, seed + 1) for seed in range(5)]
+    loader = lambda seed, _: SyntheticDataSource(n_days=2520, seed=seed)
+
+    with PairPrefetcher(pairs, loader=loader) as prefetcher:
+        pair, source = prefetcher.next_source()
+        env = PairsTradingEnv(*pair, 5, 1, data_source=source)
+        for pair, source in prefetcher:
+            start = time.time()
+            env.set_data_source(source)
+            print(f"Switched to {pair} in {(time.time() - start) * 1e6:.1f}us")
@@ -0,0 +1,142 @@
+import numpy as np
+
+class ReturnReward(object):
+    """One step return of the portfolio, the original PairsTradingEnv reward.
+
+    Reward functions keep their state in arrays, so one instance can score a batch of environments by
+    passing arrays of net asset values. Every call costs the same regardless of episode length.
+    """
+    def __init__(self, n_episodes=None):
+        """Creates a reward function.
+
+        Keyword Arguments:
+            n_episodes {int} -- number of episodes scored at once, None for a single episode (default: {None})
+        """
+        self.shape = () if n_episodes is None else (n_episodes,)
+        self.reset()
+
+    def reset(self):
+        """Resets the reward function at the start of an episode.
+        """
+        pass
+
+    def step_return(self, nav, previous_nav):
+        return np.asarray(nav, dtype=np.float64) / previous_nav - 1
+
+    def __call__(self, nav, previous_nav, turnover=0):
+        """Calculates the reward of a step.
+
+        Arguments:
+            nav {float} -- net asset value after the step
+            previous_nav {float} -- net asset value before the step
+
+        Keyword Arguments:
+            turnover {float} -- absolute change in position during the step (default: {0})
+
+        Returns:
+            float -- reward
+        """
+        return self.step_return(nav, previous_nav)
+
+class LogReturnReward(ReturnReward):
+    """One step log return of the portfolio, which adds up over an episode."""
+    def __call__(self, nav, previous_nav, turnover=0):
+        return np.log(np.asarray(nav, dtype=np.float64) / previous_nav)
+
+class DifferentialSharpeReward(ReturnReward):
+    """Differential Sharpe ratio of Moody & Saffell. The first and second moments of returns are exponential
+    moving averages, and the reward is the change in their Sharpe ratio caused by the latest return."""
+    def __init__(self, n_episodes=None, eta=0.01):
+        """Creates a reward function.
+
+        Keyword Arguments:
+            n_episodes {int} -- number of episodes scored at once, None for a single episode (default: {None})
+            eta {float} -- adaptation rate of the moving averages, roughly 1 / window length (default: {0.01})
+        """
+        self.eta = eta
+        super(DifferentialSharpeReward, self).__init__(n_episodes)
+
+    def reset(self):
+        self.first_moment = np.zeros(self.shape)
+        self.second_moment = np.zeros(self.shape)
+
+    def __call__(self, nav, previous_nav, turnover=0):
+        step_return = self.step_return(nav, previous_nav)
+
+        delta_first = step_return - self.first_moment
+        delta_second = step_return ** 2 - self.second_moment
+        variance = self.second_moment - self.first_moment ** 2
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            reward = (self.second_moment * delta_first - 0.5 * self.first_moment * delta_second) / variance ** 1.5
+        reward = np.where(variance > 0, reward, 0)
+
+        self.first_moment = self.first_moment + self.eta * delta_first
+        self.second_moment = self.second_moment + self.eta * delta_second
+        return reward
+
+class DrawdownPenaltyReward(ReturnReward):
+    """One step return, less a penalty proportional to how much the step deepens the drawdown from the
+    highest net asset value of the episode."""
+    def __init__(self, n_episodes=None, penalty=1.0):
+        """Creates a reward function.
+
+        Keyword Arguments:
+            n_episodes {int} -- number of episodes scored at once, None for a single episode (default: {None})
+            penalty {float} -- weight of the drawdown increase (default: {1.0})
+        """
+        self.penalty = penalty
+        super(DrawdownPenaltyReward, self).__init__(n_episodes)
+
+    def reset(self):
+        self.peak = np.full(self.shape, np.nan)
+        self.drawdown = np.zeros(self.shape)
+
+    def __call__(self, nav, previous_nav, turnover=0):
+        self.peak = np.fmax(self.peak, previous_nav)
+        self.peak = np.maximum(self.peak, nav)
+        drawdown = 1 - nav / self.peak
+
+        reward = self.step_return(nav, previous_nav) - self.penalty * np.maximum(drawdown - self.drawdown, 0)
+        self.drawdown = drawdown
+        return reward
+
+class TurnoverCostReward(ReturnReward):
+    """One step return, less a cost proportional to the change in position."""
+    def __init__(self, n_episodes=None, cost=0.001):
+        """Creates a reward function.
+
+        Keyword Arguments:
+            n_episodes {int} -- number of episodes scored at once, None for a single episode (default: {None})
+            cost {float} -- cost per unit of turnover, as a fraction of the portfolio (default: {0.001})
+        """
+        self.cost = cost
+        super(TurnoverCostReward, self).__init__(n_episodes)
+
+    def __call__(self, nav, previous_nav, turnover=0):
+        return self.step_return(nav, previous_nav) - self.cost * np.abs(turnover)
+
+REWARD_MODES = {
+    'return': ReturnReward,
+    'log_return': LogReturnReward,
+    'differential_sharpe': DifferentialSharpeReward,
+    'drawdown': DrawdownPenaltyReward,
+    'turnover': TurnoverCostReward,
+}
+
+def make_reward(mode='return', n_episodes=None, **kwargs):
+    """Creates a reward function by name.
+
+    Keyword Arguments:
+        mode {str} -- one of the REWARD_MODES names (default: {'return'})
+        n_episodes {int} -- number of episodes scored at once, None for a single episode (default: {None})
+
+    Key Word Arguments:
+        Passed to the reward function, such as `eta`, `penalty` or `cost`.
+
+    Returns:
+        ReturnReward -- the reward function
+    """
+    if mode not in REWARD_MODES:
+        raise ValueError(f"Unknown reward mode {mode}")
+    return REWARD_MODES[mode](n_episodes, **kwargs)
@@ -0,0 +1,19 @@
+"""Rolling window statistics over whole histories, shared by the baseline strategies and the features."""
+
+import numpy as np
+
+def rolling_sum(x, window):
+    """Sum of the last `window` values along the last axis, NaN until a full window is available.
+    """
+    cumulative = np.cumsum(x, axis=-1)
+    sums = cumulative.copy()
+    sums[..., window:] = cumulative[..., window:] - cumulative[..., :-window]
+    sums[..., :window - 1] = np.nan
+    return sums
+
+def rolling_mean_std(x, window):
+    """Rolling mean and population standard deviation along the last axis.
+    """
+    mean = rolling_sum(x, window) / window
+    variance = rolling_sum(x ** 2, window) / window - mean ** 2
+    return mean, np.sqrt(np.maximum(variance, 0))
@@ -0,0 +1,286 @@
+import numpy as np
+
+from .data_source import PRECISIONS
+
+TRADING_DAYS_PER_YEAR = 252
+
+class SyntheticPairGenerator(object):
+    """Generates cointegrated stock pairs offline. Every pair is a common log price random walk for stock 2,
+    and stock 1 follows it through a hedge ratio plus an Ornstein-Uhlenbeck spread. Volatility switches
+    between a calm and a volatile regime, the market leg has jumps, and both legs have stock splits which
+    are reported through a split coefficient exactly like Alpha Vantage data.
+
+    All pairs and all days of a chunk are generated with array operations, and the generator carries its
+    state between chunks so a long history can be streamed without holding it in memory.
+    """
+    def __init__(self, n_pairs=1, seed=None, **kwargs):
+        """Creates a SyntheticPairGenerator instance.
+
+        Keyword Arguments:
+            n_pairs {int} -- number of pairs generated side by side (default: {1})
+            seed {int} -- seed for the random number generator (default: {None})
+
+        Key Word Arguments:
+            start_date {str} -- first trading day, weekends are skipped (default: '2000-01-03')
+            half_life {(float, float)} -- range of spread mean reversion half lives in days
+            spread_vol {(float, float)} -- range of daily spread volatility
+            hedge_ratio {(float, float)} -- range of log price hedge ratio between stock 1 and stock 2
+            start_price {(float, float)} -- range of starting prices
+            market_drift {float} -- daily drift of the common log price
+            market_vol {float} -- daily volatility of the common log price
+            regime_switch_prob {float} -- daily probability of switching volatility regime
+            volatile_multiplier {float} -- volatility multiplier in the volatile regime
+            jump_prob {float} -- daily probability of a jump in the common log price
+            jump_vol {float} -- standard deviation of jump sizes
+            split_prob {float} -- daily probability of a split, per stock
+            split_ratios {list} -- split ratios to choose from
+            gap_vol {float} -- volatility of the overnight gap between close and next open
+            range_vol {float} -- scale of the intraday high and low range
+            volume {float} -- average daily volume
+            precision {str} -- 'float64' or 'float32', the precision of generated chunks (default: 'float64')
+        """
+        self.n_pairs = n_pairs
+        self.seed = seed
+
+        self.start_date = np.datetime64(kwargs.get('start_date', '2000-01-03'), 'D')
+        self.market_drift = kwargs.get('market_drift', 0.0002)
+        self.market_vol = kwargs.get('market_vol', 0.015)
+        self.regime_switch_prob = kwargs.get('regime_switch_prob', 0.01)
+        self.volatile_multiplier = kwargs.get('volatile_multiplier', 3.0)
+        self.jump_prob = kwargs.get('jump_prob', 0.005)
+        self.jump_vol = kwargs.get('jump_vol', 0.05)
+        self.split_prob = kwargs.get('split_prob', 0.0005)
+        self.split_ratios = np.asarray(kwargs.get('split_ratios', [2, 3]), dtype=np.float64)
+        self.gap_vol = kwargs.get('gap_vol', 0.005)
+        self.range_vol = kwargs.get('range_vol', 0.01)
+        self.volume = kwargs.get('volume', 1e6)
+        self.dtype = PRECISIONS[kwargs.get('precision', 'float64')]
+
+        self._rng = np.random.default_rng(seed)
+
+        # Pair parameters are drawn once and stay fixed for the generator's lifetime
+        half_life = self._rng.uniform(*kwargs.get('half_life', (5, 60)), size=n_pairs)
+        self.phi = 0.5 ** (1 / half_life)
+        self.spread_vol = self._rng.uniform(*kwargs.get('spread_vol', (0.005, 0.02)), size=n_pairs)
+        self.hedge_ratio = self._rng.uniform(*kwargs.get('hedge_ratio', (0.5, 1.5)), size=n_pairs)
+
+        start_price = self._rng.uniform(*kwargs.get('start_price', (20, 200)), size=(n_pairs, 2))
+        log_start = np.log(start_price)
+        self._market = log_start[:, 1]
+        self._intercept = log_start[:, 0] - self.hedge_ratio * log_start[:, 1]
+
+        self._spread = np.zeros(n_pairs)
+        self._regime = np.zeros(n_pairs, dtype=np.int64)
+        self._split_factor = np.ones((n_pairs, 2))
+        self._previous_close = start_price
+        self._day = 0
+
+    def next_chunk(self, n_days):
+        """Generates the next `n_days` trading days for every pair.
+
+        Arguments:
+            n_days {int} -- number of days in the chunk
+
+        Returns:
+            dict -- 'date' has shape (n_days,). 'open', 'high', 'low', 'close', 'volume' and
+                'split_coefficient' are raw Alpha Vantage style values, and 'adjusted_close' is the
+                split adjusted close, all of shape (n_pairs, n_days, 2) with the last axis being the stock.
+        """
+        rng = self._rng
+        shape = (self.n_pairs, n_days)
+
+        dates = np.busday_offset(self.start_date, np.arange(self._day, self._day + n_days), roll='forward')
+
+        # Volatility regime, a two state Markov chain per pair
+        switches = rng.random(shape) < self.regime_switch_prob
+        regime = (self._regime[:, None] + np.cumsum(switches, axis=1)) % 2
+        vol_scale = np.where(regime == 1, self.volatile_multiplier, 1.0)
+
+        # Common log price, with jumps
+        jumps = (rng.random(shape) < self.jump_prob) * rng.normal(0, self.jump_vol, shape)
+        market_returns = self.market_drift + self.market_vol * vol_scale * rng.standard_normal(shape) + jumps
+        market = self._market[:, None] + np.cumsum(market_returns, axis=1)
+
+        # Mean reverting spread
+        shocks = self.spread_vol[:, None] * vol_scale * rng.standard_normal(shape)
+        spread = _ar1_filter(self.phi, shocks, self._spread)
+
+        log_close = np.stack([
+            self._intercept[:, None] + self.hedge_ratio[:, None] * market + spread,
+            market
+        ], axis=-1)
+        adjusted_close = np.exp(log_close)
+
+        # Splits, reported as a coefficient on the day and divided out of raw prices from then on
+        split_days = rng.random(shape + (2,)) < self.split_prob
+        ratios = rng.choice(self.split_ratios, size=shape + (2,))
+        split_coefficient = np.where(split_days, ratios, 1.0)
+        split_factor = self._split_factor[:, None, :] * np.cumprod(split_coefficient, axis=1)
+
+        previous_close = np.concatenate([self._previous_close[:, None, :], adjusted_close[:, :-1, :]], axis=1)
+        adjusted_open = previous_close * np.exp(self.gap_vol * rng.standard_normal(shape + (2,)))
+        adjusted_high = np.maximum(adjusted_open, adjusted_close) * \
+            np.exp(np.abs(self.range_vol * rng.standard_normal(shape + (2,))))
+        adjusted_low = np.minimum(adjusted_open, adjusted_close) * \
+            np.exp(-np.abs(self.range_vol * rng.standard_normal(shape + (2,))))
+        volume = self.volume * vol_scale[:, :, None] * np.exp(0.3 * rng.standard_normal(shape + (2,)))
+
+        self._regime = regime[:, -1]
+        self._market = market[:, -1]
+        self._spread = spread[:, -1]
+        self._split_factor = split_factor[:, -1, :]
+        self._previous_close = adjusted_close[:, -1, :]
+        self._day += n_days
+
+        # State is kept in float64 so reduced precision output does not accumulate errors between chunks
+        return {
+            'date': dates,
+            'open': (adjusted_open / split_factor).astype(self.dtype),
+            'high': (adjusted_high / split_factor).astype(self.dtype),
+            'low': (adjusted_low / split_factor).astype(self.dtype),
+            'close': (adjusted_close / split_factor).astype(self.dtype),
+            'adjusted_close': adjusted_close.astype(self.dtype),
+            'volume': np.floor(volume * split_factor).astype(self.dtype),
+            'split_coefficient': split_coefficient.astype(self.dtype),
+        }
+
+    def chunks(self, n_days, chunk_size=TRADING_DAYS_PER_YEAR):
+        """Streams `n_days` trading days in chunks of at most `chunk_size` days.
+
+        Arguments:
+            n_days {int} -- total number of days to generate
+
+        Keyword Arguments:
+            chunk_size {int} -- number of days per chunk (default: {252})
+
+        Yields:
+            dict -- chunk, see `next_chunk`
+        """
+        remaining = n_days
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            remaining -= size
+            yield self.next_chunk(size)
+
+
+class SyntheticDataSource(object):
+    """Offline replacement for DataSource, iterating a single synthetic pair one day at a time."""
+    def __init__(self, n_days=TRADING_DAYS_PER_YEAR * 10, seed=0, **kwargs):
+        """Initialises a synthetic data source. Data is generated in chunks as it is iterated, and the
+        same seed produces the same path after every reset.
+
+        Keyword Arguments:
+            n_days {int} -- number of trading days in the dataset (default: {2520})
+            seed {int} -- seed of the pair generator (default: {0})
+
+        Key Word Arguments:
+            chunk_size {int} -- number of days generated at once (default: 252)
+            precision {str} -- 'float64' or 'float32', the precision of returned rows (default: 'float64')
+            Any other key word argument is passed to SyntheticPairGenerator.
+        """
+        self.n_days = n_days
+        self.seed = seed
+        self.chunk_size = kwargs.pop('chunk_size', TRADING_DAYS_PER_YEAR)
+        self.dtype = PRECISIONS[kwargs.pop('precision', 'float64')]
+        self._generator_kwargs = kwargs
+
+        self.starting_date = np.datetime64(kwargs.get('start_date', '2000-01-03'), 'D')
+        self.end_date = np.busday_offset(self.starting_date, n_days - 1, roll='forward')
+
+        self.reset()
+
+    def __iter__(self):
+        """Return a new iterator of stock pair data
+
+        Returns:
+            SyntheticDataSource -- The iterator
+        """
+        self.reset()
+        return self
+
+    def __next__(self):
+        """Returns the next data row in the dataset
+
+        Raises:
+            StopIteration: When last row reached
+
+        Returns:
+            tuple -- Data source information, such as current date, prices, and percentage changes.
+        """
+        if self._chunk_index >= self._chunk_length:
+            if self._days_generated >= self.n_days:
+                raise StopIteration
+            self._load_chunk()
+
+        i = self._chunk_index
+        self._chunk_index += 1
+        return (self._dates[i].item(), self._rows[i])
+
+    def reset(self):
+        """Reset iterator
+        """
+        self._generator = SyntheticPairGenerator(1, self.seed, **self._generator_kwargs)
+        self._days_generated = 0
+        self._chunk_index = 0
+        self._chunk_length = 0
+
+        self.s1_split_coefficient = 1
+        self.s2_split_coefficient = 1
+
+    def _load_chunk(self):
+        """Generates the next chunk and converts it to the rows returned by `__next__`, applying
+        split coefficients the same way DataSource does.
+        """
+        size = min(self.chunk_size, self.n_days - self._days_generated)
+        chunk = self._generator.next_chunk(size)
+        self._days_generated += size
+
+        coefficients = np.cumprod(chunk['split_coefficient'][0], axis=0) * \
+            np.array([self.s1_split_coefficient, self.s2_split_coefficient])
+        self.s1_split_coefficient, self.s2_split_coefficient = coefficients[-1]
+
+        opens = chunk['open'][0] * coefficients
+        closes = chunk['close'][0] * coefficients
+        percent_changes = (closes - opens) / opens
+
+        self._dates = chunk['date']
+        self._rows = np.concatenate([closes, percent_changes], axis=1).astype(self.dtype)
+        self._chunk_index = 0
+        self._chunk_length = size
+
+
+def _ar1_filter(phi, shocks, x0):
+    """Evaluates x_t = phi * x_{t-1} + shocks_t along the last axis with a doubling scan, which needs
+    log2(n_days) array operations instead of a Python loop over days.
+
+    Arguments:
+        phi {numpy.Array} -- autoregressive coefficient per row, shape (n,)
+        shocks {numpy.Array} -- shocks, shape (n, n_days)
+        x0 {numpy.Array} -- value before the first day, shape (n,)
+
+    Returns:
+        numpy.Array -- filtered series, shape (n, n_days)
+    """
+    x = shocks.copy()
+    n_days = x.shape[1]
+    coefficient = phi.copy()
+    lag = 1
+    while lag < n_days:
+        x[:, lag:] = x[:, lag:] + coefficient[:, None] * x[:, :-lag]
+        coefficient = coefficient * coefficient
+        lag *= 2
+    return x + phi[:, None] ** np.arange(1, n_days + 1) * x0[:, None]
+
+
+if __name__=='__main__':
+    import time
+
+    generator = SyntheticPairGenerator(n_pairs=1000, seed=0)
+    start = time.time()
+    bars = 0
+    for chunk in generator.chunks(TRADING_DAYS_PER_YEAR * 20):
+        bars += chunk['close'].size
+    print(f"Generated {bars} bars in {time.time() - start:.2f}s")
+
+    ds = SyntheticDataSource(n_days=10, seed=1)
+    for date, data in ds: print(date, data)
@@ -56,6 +56,16 @@ class TradingSim(object):
             self.stock1_balance * stock1_price + \
             self.stock2_balance * stock2_price
 
+    def get_position(self):
+        """Gets the signed position of the portfolio
+
+        Returns:
+            int -- 1 when holding stock 1, -1 when holding stock 2, otherwise 0
+        """
+        if self.status != Status.INVESTED_IN_SPREAD:
+            return 0
+        return 1 if self.stock1_balance > 0 else -1
+
     def execute(self, action, spread, stock1_price, stock2_price, penalty):
         """Execute an action, either buy sell or hold
         
@@ -160,17 +170,18 @@ class TradingSimV2(object):
     def __init__(self, **kwargs):
         start_balance = kwargs.get('start_balance', 10000)
         transaction_fee = kwargs.get('transaction_fee', 50)
+        self.dtype = np.dtype(kwargs.get('precision', 'float32'))
         
-        self._values = np.array([0, 0, 1.0], dtype=np.float32)
-        self._balances = np.array([0, 0, start_balance], dtype=np.float32)
+        self._values = np.array([0, 0, 1.0], dtype=self.dtype)
+        self._balances = np.array([0, 0, start_balance], dtype=self.dtype)
         
         self.start_balance = start_balance
     
         self.transaction_fee = transaction_fee
 
     def reset(self):
-        self._values = np.array([0, 0, 1.0], dtype=np.float32)
-        self._balances = np.array([0, 0, self.start_balance], dtype=np.float32)
+        self._values = np.array([0, 0, 1.0], dtype=self.dtype)
+        self._balances = np.array([0, 0, self.start_balance], dtype=self.dtype)
 
     def update_values(self, stock_1_price, stock_2_price):
         self._values[0] = stock_1_price
@@ -211,7 +222,7 @@ class TradingSimV2(object):
         stock_2_delta, cash_2_delta = self.get_balance_delta(monatary_delta[1], stock_2_price)
 
         cash_delta = monatary_delta[2]+cash_1_delta+cash_2_delta
-        value_delta = np.array([stock_1_delta, stock_2_delta, cash_delta], dtype=np.float32)
+        value_delta = np.array([stock_1_delta, stock_2_delta, cash_delta], dtype=self.dtype)
         self._balances += value_delta
         self._balances[2] -= self.transaction_fee*2
 
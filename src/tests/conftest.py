@@ -0,0 +1,35 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from ..gym_pairs_trading.envs import data_source as data_source_module
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+
+def write_cache(directory, monkeypatch, split_row=None):
+    """Writes the repository's CSV files into an Alpha Vantage style cache, so DataSource runs offline.
+    With `split_row`, AAPL has a 7:1 split on that row, as in 2014 on Alpha Vantage"""
+    today = str(datetime.today().date())
+    for symbol, file_name, columns in [
+        ('AAPL', 'AAPL.csv', ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']),
+        ('HD', 'EOD-HD.csv', ['Open', 'High', 'Low', 'Close', 'Adj_Close', 'Volume']),
+    ]:
+        data = pd.read_csv(os.path.join(DATA_DIRECTORY, file_name), index_col='Date')[columns]
+        data.columns = ['1. open', '2. high', '3. low', '4. close', '5. adjusted close', '6. volume']
+        data['7. dividend amount'] = 0.0
+        data['8. split coefficient'] = 1.0
+        if split_row is not None and symbol == 'AAPL':
+            data.iloc[split_row:, :4] /= 7
+            data.iloc[split_row, data.columns.get_loc('8. split coefficient')] = 7.0
+        data.to_csv(directory / f"{symbol}_compact_{today}.csv", index_label=False)
+    monkeypatch.setattr(data_source_module, 'CACHE_DIRECTORY', str(directory))
+
+@pytest.fixture
+def load_cache(tmp_path, monkeypatch):
+    write_cache(tmp_path, monkeypatch)
+
+@pytest.fixture
+def load_split_cache(tmp_path, monkeypatch):
+    write_cache(tmp_path, monkeypatch, split_row=300)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading.envs.baselines import STRATEGIES, band_positions, distance_positions, simulate_positions, \
+    grid_search
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticPairGenerator
+from ..gym_pairs_trading.envs.trading_sim import TradingSim, Actions
+
+@pytest.fixture
+def load_prices():
+    chunk = SyntheticPairGenerator(n_pairs=3, seed=0).next_chunk(400)
+    return chunk['adjusted_close'][:, :, 0], chunk['adjusted_close'][:, :, 1]
+
+def test_band_positions_match_state_machine():
+    rng = np.random.default_rng(0)
+    score = np.cumsum(rng.normal(0, 0.5, 500))
+    score -= score.mean()
+    entry, exit = 1.5, 0.25
+
+    expected = []
+    position = 0
+    for value in score:
+        if value < -entry:
+            position = 1
+        elif value > entry:
+            position = -1
+        elif (position == 1 and value >= -exit) or (position == -1 and value <= exit):
+            position = 0
+        expected.append(position)
+
+    assert np.array_equal(band_positions(score, entry, exit), expected)
+
+def test_simulation_matches_trading_sim(load_prices):
+    prices_1, prices_2 = load_prices
+    positions = np.repeat(np.array([0, 1, 1, 0, -1, -1, 1, 0] * 5), 10)
+    nav = simulate_positions(positions, prices_1[0], prices_2[0])
+
+    trading_sim = TradingSim()
+    held = 0
+    for t, position in enumerate(positions):
+        if position != held and held != 0:
+            trading_sim.execute(Actions.SELL.value, 0, prices_1[0, t], prices_2[0, t], 1)
+        if position != held and position != 0:
+            trading_sim.execute(Actions.BUY.value, -position, prices_1[0, t], prices_2[0, t], 1)
+        held = position
+        assert nav[t] == pytest.approx(trading_sim.get_NAV(prices_1[0, t], prices_2[0, t]))
+
+def test_distance_uses_formation_periods(load_prices):
+    prices_1, prices_2 = load_prices[0][0], load_prices[1][0]
+    window = 20
+    score = np.full(len(prices_1), np.nan)
+    for t in range(window, len(prices_1)):
+        start = t - window
+        formation = prices_1[start:t] / prices_1[start] - prices_2[start:t] / prices_2[start]
+        score[t] = (prices_1[t] / prices_1[start] - prices_2[t] / prices_2[start]) / formation.std()
+
+    expected = band_positions(score, 2.0, 0.0)
+    assert np.array_equal(distance_positions(prices_1, prices_2, window, 2.0, 0.0), expected)
+
+@pytest.mark.parametrize('name', list(STRATEGIES))
+def test_strategies_broadcast_thresholds(load_prices, name):
+    prices_1, prices_2 = load_prices
+    entry = np.array([1.5, 2.0])[:, None]
+    positions = STRATEGIES[name](prices_1, prices_2, 20, entry, 0.0)
+    assert positions.shape == (2, 3, 400)
+    assert set(np.unique(positions)) <= {-1, 0, 1}
+    assert np.array_equal(positions[1, 2], STRATEGIES[name](prices_1[2], prices_2[2], 20, 2.0, 0.0))
+
+def test_grid_search(load_prices):
+    prices_1, prices_2 = load_prices
+    grid = {'window': [10, 30], 'entry': [1.0, 2.0, 3.0], 'exit': [0.0, 0.5]}
+    params, metrics = grid_search('zscore', prices_1, prices_2, grid)
+    assert len(params) == 12
+    assert metrics['total_return'].shape == (12, 3)
+
+    i = params.index({'window': 30, 'entry': 2.0, 'exit': 0.5})
+    nav = simulate_positions(STRATEGIES['zscore'](prices_1, prices_2, 30, 2.0, 0.5), prices_1, prices_2)
+    assert np.allclose(metrics['total_return'][i], nav[:, -1] / nav[:, 0] - 1)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv
+from ..gym_pairs_trading.envs.bootstrap import BlockBootstrapSampler, BootstrapDataSource
+from ..gym_pairs_trading.envs.data_source import ArrayDataSource
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+@pytest.fixture
+def load_data():
+    return ArrayDataSource.from_data_source(SyntheticDataSource(n_days=500, seed=2)).data
+
+def test_array_data_source(load_data):
+    ds = ArrayDataSource(load_data)
+    rows = [data for _, data in ds]
+    assert np.array_equal(np.array(rows), load_data)
+    ds.reset()
+    assert next(ds)[0] == 0
+
+@pytest.mark.parametrize('method', ['stationary', 'moving'])
+def test_sample_shapes_and_prices(load_data, method):
+    sampler = BlockBootstrapSampler(load_data, block_size=10, method=method, seed=0)
+    episodes = sampler.sample(16, 120)
+    assert episodes.shape == (16, 120, 4)
+    assert np.all(episodes[:, 0] == load_data[0])
+
+    # Every resampled log return and percent change pair exists in the original data
+    log_returns = np.log(episodes[:, 1:, :2] / episodes[:, :-1, :2])
+    original = np.concatenate([np.log(load_data[1:, :2] / load_data[:-1, :2]), load_data[1:, 2:]], axis=1)
+    resampled = np.concatenate([log_returns, episodes[:, 1:, 2:]], axis=2).reshape(-1, 4)
+    distances = np.abs(resampled[:, None, :] - original[None, :, :]).max(axis=2)
+    assert np.all(distances.min(axis=1) < 1e-9)
+
+def test_moving_blocks_are_contiguous(load_data):
+    sampler = BlockBootstrapSampler(load_data, block_size=8, method='moving', seed=1)
+    indices = sampler.sample_indices(5, 64)
+    within_block = np.arange(1, 64) % 8 != 0
+    assert np.all(np.diff(indices, axis=1)[:, within_block] == 1)
+
+def test_sampling_is_seeded(load_data):
+    first = BlockBootstrapSampler(load_data, seed=4).sample(3, 50)
+    second = BlockBootstrapSampler(load_data, seed=4).sample(3, 50)
+    assert np.array_equal(first, second)
+
+def test_env_gets_new_episode_on_reset(load_data):
+    sampler = BlockBootstrapSampler(load_data, seed=5)
+    ds = BootstrapDataSource(sampler, 100, batch_size=2)
+    env = PairsTradingEnv(None, None, 5, 0, data_source=ds)
+
+    episodes = []
+    for _ in range(3):
+        env.reset()
+        episodes.append(ds.data.copy())
+        env.step(Actions.HOLD.value, 1)
+    assert not np.array_equal(episodes[0], episodes[1])
+    assert not np.array_equal(episodes[1], episodes[2])
+
+    # No episode of a batch is skipped
+    expected = BlockBootstrapSampler(load_data, seed=5)
+    first_batch, second_batch = expected.sample(2, 100), expected.sample(2, 100)
+    assert np.array_equal(episodes[0], first_batch[0])
+    assert np.array_equal(episodes[1], first_batch[1])
+    assert np.array_equal(episodes[2], second_batch[0])
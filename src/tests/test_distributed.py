@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv
+from ..gym_pairs_trading.envs.distributed import RolloutCoordinator, RolloutWorker
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+N_DAYS = 60
+
+def synthetic_env():
+    return PairsTradingEnv(None, None, 5, 1, data_source=SyntheticDataSource(n_days=N_DAYS, seed=0))
+
+@pytest.fixture
+def load_workers():
+    workers = [RolloutWorker(synthetic_env, n_envs).start() for n_envs in (2, 3)]
+    yield workers
+    for worker in workers:
+        worker.close()
+
+def test_matches_local_envs(load_workers):
+    coordinator = RolloutCoordinator([worker.address for worker in load_workers])
+    assert coordinator.n_envs == 5
+
+    envs = [synthetic_env() for _ in range(5)]
+    expected = np.array([env.reset() for env in envs], dtype=np.float32)
+    assert np.array_equal(coordinator.reset(), expected)
+
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        actions = rng.integers(0, 3, 5)
+        obs, rewards, dones, info = coordinator.step(actions)
+        for i, env in enumerate(envs):
+            expected_obs, expected_reward, _, _ = env.step(int(actions[i]), 1)
+            assert np.allclose(obs[i], expected_obs)
+            assert rewards[i] == pytest.approx(expected_reward, abs=1e-6)
+        assert not dones.any()
+        assert info['failed_workers'] == []
+    coordinator.close()
+
+def test_done_envs_are_reset(load_workers):
+    coordinator = RolloutCoordinator([worker.address for worker in load_workers])
+    first = coordinator.reset()
+    actions = np.full(coordinator.n_envs, Actions.HOLD.value)
+
+    for _ in range(N_DAYS):
+        obs, _, dones, _ = coordinator.step(actions)
+        if dones.any():
+            break
+    assert dones.all()
+    assert np.array_equal(obs, first)
+    coordinator.close()
+
+def test_worker_failure_and_reconnection(load_workers):
+    coordinator = RolloutCoordinator([worker.address for worker in load_workers], retry_interval=0)
+    coordinator.reset()
+    actions = np.full(coordinator.n_envs, Actions.HOLD.value)
+
+    address = load_workers[1].address
+    load_workers[1].close()
+    obs, rewards, dones, info = coordinator.step(actions)
+    assert info['failed_workers'] == [1]
+    assert dones[2:].all() and not dones[:2].any()
+    assert np.all(obs[2:] == 0) and np.all(rewards[2:] == 0)
+
+    load_workers[1] = RolloutWorker(synthetic_env, 3, *address).start()
+    obs, _, dones, info = coordinator.step(actions)
+    assert info['failed_workers'] == []
+    assert dones[2:].all()
+    assert np.array_equal(obs[2:], np.array([synthetic_env().reset()] * 3, dtype=np.float32))
+
+    _, _, dones, _ = coordinator.step(actions)
+    assert not dones.any()
+    coordinator.close()
+
+def test_env_errors_are_reported(load_workers):
+    coordinator = RolloutCoordinator([worker.address for worker in load_workers], retry_interval=60)
+    coordinator.reset()
+    obs, rewards, dones, info = coordinator.step(np.full(coordinator.n_envs, 7))
+    assert info['failed_workers'] == [0, 1]
+    assert sorted(info['errors']) == [0, 1]
+    assert all(str(load_workers[i].address) in info['errors'][i] for i in (0, 1))
+    assert dones.all() and np.all(obs == 0) and np.all(rewards == 0)
+    coordinator.close()
+
+def test_one_worker_error_keeps_others_in_step(load_workers):
+    coordinator = RolloutCoordinator([worker.address for worker in load_workers], retry_interval=0)
+    envs = [synthetic_env() for _ in range(5)]
+    for env in envs:
+        env.reset()
+    coordinator.reset()
+    assert coordinator.errors == {}
+
+    hold = Actions.HOLD.value
+    obs, rewards, dones, info = coordinator.step([7, 7, hold, hold, hold])
+    assert info['failed_workers'] == [0]
+    assert list(info['errors']) == [0]
+    assert dones[:2].all() and not dones[2:].any()
+    assert np.all(obs[:2] == 0) and np.all(rewards[:2] == 0)
+    assert np.allclose(obs[2:], [env.step(hold, 1)[0] for env in envs[2:]])
+
+    # The worker that raised is reset once reconnected
+    obs, _, dones, info = coordinator.step(np.full(5, hold))
+    assert info['failed_workers'] == [] and info['errors'] == {}
+    assert dones[:2].all() and not dones[2:].any()
+    assert np.allclose(obs[:2], [env.reset() for env in envs[:2]])
+    assert np.allclose(obs[2:], [env.step(hold, 1)[0] for env in envs[2:]])
+
+    for _ in range(3):
+        obs, _, dones, _ = coordinator.step(np.full(5, hold))
+        assert not dones.any()
+        assert np.allclose(obs, [env.step(hold, 1)[0] for env in envs])
+    coordinator.close()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv
+from ..gym_pairs_trading.envs.data_source import ArrayDataSource
+from ..gym_pairs_trading.envs.features import FEATURES, CONSISTENCY_TOLERANCE, FeaturePipeline, make_feature, \
+    check_consistency
+from ..gym_pairs_trading.envs.market_metrics import MarketMetrics
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+@pytest.fixture
+def load_data():
+    return ArrayDataSource.from_data_source(SyntheticDataSource(n_days=400, seed=6, split_prob=0.01)).data
+
+@pytest.mark.parametrize('name', list(FEATURES))
+@pytest.mark.parametrize('window', [3, 20])
+def test_batch_and_incremental_agree(load_data, name, window):
+    feature = make_feature((name, {'window': window}))
+    assert check_consistency(feature, load_data) < CONSISTENCY_TOLERANCE
+    assert feature.batch(load_data).shape == (len(load_data), feature.size)
+
+@pytest.mark.parametrize('name', list(FEATURES))
+def test_batches_of_pairs(load_data, name):
+    feature = make_feature(name)
+    pairs = np.stack([load_data, load_data[:, [1, 0, 3, 2]]])
+    expected = np.stack([feature.batch(data) for data in pairs])
+    assert np.array_equal(feature.batch(pairs), expected)
+
+def test_pipeline_batches_of_pairs(load_data):
+    pipeline = FeaturePipeline(list(FEATURES))
+    pairs = np.stack([load_data, load_data[:, [1, 0, 3, 2]]])
+    assert np.array_equal(pipeline.batch(pairs), np.stack([pipeline.batch(data) for data in pairs]))
+
+def test_pipeline_agrees(load_data):
+    pipeline = FeaturePipeline(list(FEATURES))
+    assert check_consistency(pipeline, load_data) < CONSISTENCY_TOLERANCE
+    assert pipeline.size == 10 + 1 + 1 + 2
+
+def test_spread_matches_market_metrics(load_data):
+    market_metrics = MarketMetrics()
+    spread = make_feature('spread')
+    for row in load_data:
+        expected, _ = market_metrics.update(row[0], row[1])
+        assert spread.update(row)[0] == pytest.approx(expected, abs=1e-12)
+
+def test_unknown_feature():
+    with pytest.raises(ValueError):
+        make_feature('momentum')
+
+def test_env_observations_from_features(load_data):
+    features = [('lagged_returns', {'window': 3}), 'zscore', 'volatility']
+    env = PairsTradingEnv(None, None, 5, 1, data_source=ArrayDataSource(load_data), features=features)
+    assert env.observation_space.shape == (10,)
+
+    expected = FeaturePipeline(features).batch(load_data)
+    obs = env.reset()
+    assert obs[:-1] == pytest.approx(expected[19])
+    for day in range(20, 40):
+        obs, _, _, _ = env.step(Actions.HOLD.value, 1)
+        assert obs[:-1] == pytest.approx(expected[day])
+        assert obs[-1] == env.trading_sim.status.value
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading.envs.data_source import DataSource, OHLC_COLUMNS
+from ..gym_pairs_trading.envs.order_fills import OrderBook, OrderType, fill_prices, cash_flows, CLOSE
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+BUY, SELL = Actions.BUY.value, Actions.SELL.value
+LIMIT, STOP, MARKET_ON_CLOSE = OrderType.LIMIT.value, OrderType.STOP.value, OrderType.MARKET_ON_CLOSE.value
+
+# open, high, low, close
+BAR = np.array([100.0, 105.0, 95.0, 102.0])
+
+@pytest.mark.parametrize('side, order_type, price, expected', [
+    (BUY, LIMIT, 97, 97),
+    (BUY, LIMIT, 94, np.nan),
+    (BUY, LIMIT, 101, 100),
+    (SELL, LIMIT, 104, 104),
+    (SELL, LIMIT, 106, np.nan),
+    (SELL, LIMIT, 99, 100),
+    (BUY, STOP, 104, 104),
+    (BUY, STOP, 106, np.nan),
+    (BUY, STOP, 99, 100),
+    (SELL, STOP, 96, 96),
+    (SELL, STOP, 94, np.nan),
+    (SELL, STOP, 101, 100),
+    (BUY, MARKET_ON_CLOSE, np.nan, 102),
+    (SELL, MARKET_ON_CLOSE, np.nan, 102),
+])
+def test_fill_rules(side, order_type, price, expected):
+    filled, fill_price = fill_prices(BAR, side, order_type, price)
+    assert filled == (not np.isnan(expected))
+    assert np.array_equal(fill_price, expected, equal_nan=True)
+
+def test_fill_prices_are_vectorized():
+    bars = np.stack([BAR, BAR * 2])
+    filled, fill_price = fill_prices(bars[:, None], [BUY, SELL], LIMIT, [[97, 104], [97, 104]])
+    assert filled.shape == (2, 2)
+    assert np.array_equal(filled, [[True, True], [False, True]])
+    assert np.array_equal(fill_price, [[97, 104], [np.nan, 200]], equal_nan=True)
+
+def test_order_book_fills_and_cancels():
+    book = OrderBook()
+    bars = np.stack([np.stack([BAR, BAR / 2]), np.stack([BAR * 2, BAR])])
+
+    ids = book.submit([0, 1], 1, BUY, LIMIT, [48, 48], quantity=10)
+    book.submit(0, 0, SELL, MARKET_ON_CLOSE)
+    cancelled = book.submit(1, 0, BUY, STOP, 150)
+    book.cancel(ids=cancelled)
+    assert len(book) == 3
+
+    fills = book.match(bars)
+    assert list(fills['id']) == [ids[0], ids[1] + 1]
+    assert np.array_equal(fills['price'], [48, BAR[CLOSE]])
+    assert np.array_equal(cash_flows(fills, transaction_fee=10), [-490, BAR[CLOSE] - 10])
+    assert list(book.orders['id']) == [ids[1]]
+
+    book.cancel(pairs=[1])
+    assert len(book) == 0
+
+def test_group_fills_once_with_stop_first():
+    book = OrderBook()
+    stop, take_profit = book.submit(0, 0, SELL, [STOP, LIMIT], [96, 104], group=7)
+    other = book.submit(0, 1, SELL, LIMIT, 200, group=8)
+
+    fills = book.match(np.stack([BAR, BAR])[None])
+    assert list(fills['id']) == [stop]
+    assert list(book.orders['id']) == list(other)
+
+def test_market_on_close_matches_data_source(load_cache):
+    ds = DataSource('AAPL', 'HD', size='compact', columns=OHLC_COLUMNS)
+    dates, bars = ds.ohlc()
+    rows = [(date, data) for date, data in ds]
+
+    assert dates == [date for date, _ in rows]
+    rows = np.array([data for _, data in rows])
+    _, closes = fill_prices(bars, BUY, MARKET_ON_CLOSE, np.nan)
+    assert np.allclose(closes, rows[:, :2])
+    assert np.allclose((bars[..., 3] - bars[..., 0]) / bars[..., 0], rows[:, 2:])
+    assert np.all(bars[..., 2] <= bars[..., 1])
+
+    with pytest.raises(ValueError):
+        DataSource('AAPL', 'HD', size='compact').ohlc()
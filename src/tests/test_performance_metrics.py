@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv
+from ..gym_pairs_trading.envs.performance_metrics import StreamingMetrics, MetricsWrapper, compute_metrics
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+@pytest.fixture
+def load_paths():
+    rng = np.random.default_rng(0)
+    nav = 10000 * np.cumprod(1 + rng.normal(0.0005, 0.01, (6, 300)), axis=1)
+    # Positions held for random lengths, switching between stock 1, out and stock 2
+    positions = np.repeat(rng.choice([-1.0, 0.0, 1.0], (6, 30)), 10, axis=1)
+    return nav, positions
+
+def test_streaming_matches_batch(load_paths):
+    nav, positions = load_paths
+    streaming = StreamingMetrics(n_episodes=nav.shape[0])
+    streaming.reset(nav[:, 0], positions[:, 0])
+    for t in range(1, nav.shape[1]):
+        streaming.update(nav[:, t], positions[:, t])
+
+    expected = compute_metrics(nav, positions)
+    for name, value in streaming.metrics().items():
+        assert np.allclose(value, expected[name], equal_nan=True), name
+
+def test_known_values():
+    nav = np.array([100, 110, 99, 121, 121.0])
+    positions = np.array([0, 1, 1, 0, 0])
+    metrics = compute_metrics(nav, positions)
+
+    assert metrics['total_return'] == pytest.approx(0.21)
+    assert metrics['max_drawdown'] == pytest.approx(0.1)
+    assert metrics['turnover'] == pytest.approx(0.5)
+    assert metrics['n_trades'] == 1
+    assert metrics['hit_rate'] == 1
+    assert metrics['mean_holding_period'] == 2
+
+    returns = nav[1:] / nav[:-1] - 1
+    assert metrics['sharpe'] == pytest.approx(returns.mean() / returns.std(ddof=1) * np.sqrt(252))
+
+def test_no_trades_are_nan():
+    metrics = compute_metrics(np.array([1.0, 1.1, 1.2]))
+    assert metrics['n_trades'] == 0
+    assert np.isnan(metrics['hit_rate'])
+    assert np.isnan(metrics['mean_holding_period'])
+
+def test_env_wrapper():
+    env = MetricsWrapper(PairsTradingEnv(None, None, 5, 1, data_source=SyntheticDataSource(n_days=200, seed=1)))
+    env.reset()
+    navs = [env.portfolio_value]
+    done = False
+    actions = [Actions.BUY.value, Actions.HOLD.value, Actions.SELL.value, Actions.HOLD.value]
+    step = 0
+    while not done:
+        _, _, done, info = env.step(actions[step % len(actions)], 1)
+        if not done:
+            navs.append(env.portfolio_value)
+        step += 1
+
+    metrics = info['metrics']
+    assert metrics['total_return'] == pytest.approx(navs[-1] / navs[0] - 1)
+    assert metrics['n_trades'] > 0
+    assert metrics['mean_holding_period'] == 2
+
+def test_no_steps_are_nan():
+    streaming = StreamingMetrics()
+    streaming.reset(10000)
+    for metrics in (streaming.metrics(), compute_metrics(np.array([10000.0]))):
+        assert metrics['total_return'] == 0
+        assert np.isnan(metrics['annualised_return'])
+        assert np.isnan(metrics['sharpe'])
+        assert np.isnan(metrics['turnover'])
+
+    env = MetricsWrapper(PairsTradingEnv(None, None, 5, 1, data_source=SyntheticDataSource(n_days=200, seed=1)))
+    env.reset()
+    assert np.isnan(env.get_metrics()['annualised_return'])
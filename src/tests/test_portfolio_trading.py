@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv, PortfolioTradingEnv
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+@pytest.fixture
+def load_data_sources():
+    return [SyntheticDataSource(n_days=150, seed=seed) for seed in range(3)]
+
+def test_single_pair_matches_pairs_trading_env(load_data_sources):
+    pair_env = PairsTradingEnv(None, None, 5, 1, data_source=load_data_sources[0])
+    portfolio_env = PortfolioTradingEnv.from_data_sources(load_data_sources[:1])
+
+    pair_obs = pair_env.reset()
+    portfolio_obs = portfolio_env.reset()
+    assert portfolio_obs[0, -2] == pytest.approx(pair_obs[-2])
+
+    rng = np.random.default_rng(0)
+    done = False
+    while not done:
+        action = rng.integers(0, 3)
+        pair_obs, pair_reward, done, pair_info = pair_env.step(action, 1)
+        portfolio_obs, portfolio_reward, portfolio_done, portfolio_info = portfolio_env.step([action])
+        assert done == portfolio_done
+        if not done:
+            assert portfolio_info['date'] == pair_info['date']
+            assert portfolio_reward == pytest.approx(pair_reward)
+            assert portfolio_obs[0, -2:] == pytest.approx(pair_obs[-2:])
+
+def test_shared_cash(load_data_sources):
+    env = PortfolioTradingEnv.from_data_sources(load_data_sources, allocation=0.5)
+    obs = env.reset()
+    assert obs.shape == env.observation_space.shape == (3, 12)
+
+    env.step([Actions.BUY.value] * 3)
+    assert np.count_nonzero(env.invested) == 3
+    assert env.balance >= 0
+    assert env.portfolio_value == pytest.approx(env.get_NAV())
+
+    env.step([Actions.SELL.value, Actions.HOLD.value, Actions.HOLD.value])
+    assert list(env.invested) == [False, True, True]
+    assert np.all(env.stock_balances[0] == 0)
+
+def test_penalty_on_illegal_actions(load_data_sources):
+    env = PortfolioTradingEnv.from_data_sources(load_data_sources)
+    env.reset()
+    env.step([Actions.SELL.value, Actions.SELL.value, Actions.HOLD.value], penalty=0.9)
+    assert env.balance == pytest.approx(env.start_balance * 0.81)
+
+def test_many_pairs():
+    rng = np.random.default_rng(1)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (60, 300, 2)), axis=0))
+    data = np.concatenate([closes, rng.normal(0, 0.01, (60, 300, 2))], axis=2)
+    env = PortfolioTradingEnv(data)
+    env.reset()
+
+    n_entries = n_exits = 0
+    done = False
+    while not done:
+        was_invested = env.invested.copy()
+        _, _, done, _ = env.step(rng.integers(0, 3, 300))
+        n_entries += np.count_nonzero(env.invested & ~was_invested)
+        n_exits += np.count_nonzero(~env.invested & was_invested)
+        assert env.balance >= 0
+        assert env.portfolio_value == pytest.approx(env.get_NAV())
+    assert n_entries > 300 and n_exits > 300
+
+def test_unaffordable_allocation_warns():
+    data = np.concatenate([np.full((30, 300, 2), 100.0), np.zeros((30, 300, 2))], axis=2)
+    with pytest.warns(UserWarning):
+        PortfolioTradingEnv(data, start_balance=10000)
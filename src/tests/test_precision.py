@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv, PortfolioTradingEnv
+from ..gym_pairs_trading.envs.data_source import DataSource, ArrayDataSource, USED_COLUMNS, FLOAT32_ERROR_BOUNDS
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+def test_data_source_columns_and_precision(load_cache):
+    ds = DataSource('AAPL', 'HD', size='compact', precision='float32')
+    assert list(ds.d1.columns) == USED_COLUMNS
+    assert all(dtype == np.float32 for dtype in ds.d1.dtypes)
+
+    full = DataSource('AAPL', 'HD', size='compact', columns=None)
+    assert len(full.d1.columns) == 8
+    assert ds.d1.memory_usage().sum() < full.d1.memory_usage().sum() / 3
+
+    rows_32 = np.array([data for _, data in ds])
+    rows_64 = np.array([data for _, data in full])
+    assert rows_32.dtype == np.float32
+    assert len(rows_32) > 700
+    assert np.all(np.abs(rows_32[:, :2] / rows_64[:, :2] - 1) <= FLOAT32_ERROR_BOUNDS['price'])
+    assert np.all(np.abs(rows_32[:, 2:] - rows_64[:, 2:]) <= FLOAT32_ERROR_BOUNDS['percent_change'])
+
+def test_split_error_bounds(load_split_cache):
+    rows_32 = np.array([data for _, data in DataSource('AAPL', 'HD', size='compact', precision='float32')])
+    rows_64 = np.array([data for _, data in DataSource('AAPL', 'HD', size='compact')])
+    # The split is invisible in split adjusted prices
+    assert abs(rows_64[300, 0] / rows_64[299, 0] - 1) < 0.2
+    assert np.all(np.abs(rows_32[:, :2] / rows_64[:, :2] - 1) <= FLOAT32_ERROR_BOUNDS['price'])
+    assert np.all(np.abs(rows_32[:, 2:] - rows_64[:, 2:]) <= FLOAT32_ERROR_BOUNDS['percent_change'])
+
+def test_env_observation_error_bounds():
+    envs = [PairsTradingEnv(None, None, 5, 1, data_source=SyntheticDataSource(n_days=500, seed=0, precision=precision),
+        precision=precision) for precision in ('float32', 'float64')]
+    observations = [env.reset() for env in envs]
+    assert observations[0].dtype == np.float32
+    assert observations[0] in envs[0].observation_space
+
+    done = False
+    while not done:
+        assert np.all(np.abs(observations[0][:10] - observations[1][:10]) <= FLOAT32_ERROR_BOUNDS['percent_change'])
+        assert abs(observations[0][10] - observations[1][10]) <= FLOAT32_ERROR_BOUNDS['spread']
+        observations = []
+        for env in envs:
+            obs, _, done, _ = env.step(Actions.HOLD.value, 1)
+            observations.append(obs)
+
+def test_env_nav_and_reward_error_bounds():
+    envs = [PairsTradingEnv(None, None, 5, 1, data_source=SyntheticDataSource(n_days=2520, seed=1, precision=precision),
+        precision=precision) for precision in ('float32', 'float64')]
+    for env in envs:
+        env.reset()
+
+    actions = [Actions.BUY.value, Actions.HOLD.value, Actions.HOLD.value, Actions.SELL.value, Actions.HOLD.value]
+    for day in range(2000):
+        (_, reward_32, _, _), (_, reward_64, _, _) = [env.step(actions[day % 5], 1) for env in envs]
+        sims = [env.trading_sim for env in envs]
+        assert type(sims[0].balance) is float
+        assert (sims[0].stock1_balance, sims[0].stock2_balance) == (sims[1].stock1_balance, sims[1].stock2_balance)
+        assert abs(envs[0].portfolio_value / envs[1].portfolio_value - 1) <= FLOAT32_ERROR_BOUNDS['nav']
+        assert abs(reward_32 - reward_64) <= FLOAT32_ERROR_BOUNDS['reward']
+
+def test_portfolio_error_bounds():
+    data_sources = [SyntheticDataSource(n_days=300, seed=seed) for seed in range(4)]
+    env_32 = PortfolioTradingEnv.from_data_sources(data_sources, precision='float32')
+    env_64 = PortfolioTradingEnv.from_data_sources(data_sources)
+    assert env_32.data.dtype == env_32.spreads.dtype == np.float32
+    assert env_32.reset().dtype == np.float32
+    assert np.max(np.abs(env_32.spreads - env_64.spreads)) <= FLOAT32_ERROR_BOUNDS['spread']
+
+def test_compact_day_index():
+    source = SyntheticDataSource(n_days=50, seed=0)
+    dates = [date for date, _ in source]
+    array = ArrayDataSource.from_data_source(source, precision='float32')
+    assert array.day_index.dtype == np.int32
+    assert array.data.dtype == np.float32
+    assert array.dates == dates
+    assert [date for date, _ in array] == dates
+
+def test_undated_sources_keep_row_numbers():
+    data = np.ones((3, 4))
+    assert ArrayDataSource.from_data_source(ArrayDataSource(data)).dates == [0, 1, 2]
+    assert ArrayDataSource(data, dates=[5, 6, 7]).dates == [5, 6, 7]
+    assert ArrayDataSource(data, dates=np.arange(3)).day_index is None
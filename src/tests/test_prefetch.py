@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv
+from ..gym_pairs_trading.envs.prefetch import PairPrefetcher
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+def synthetic_loader(seed, n_days):
+    return SyntheticDataSource(n_days=n_days, seed=seed)
+
+def test_pairs_are_loaded_in_order():
+    pairs = [(seed, 100) for seed in range(4)]
+    with PairPrefetcher(pairs, loader=synthetic_loader) as prefetcher:
+        loaded = list(prefetcher)
+
+    assert [pair for pair, _ in loaded] == pairs
+    expected = [data for _, data in SyntheticDataSource(n_days=100, seed=2)]
+    assert np.array_equal(loaded[2][1].data, np.array(expected))
+
+def test_memory_budget():
+    loaded = []
+
+    def loader(seed, n_days):
+        loaded.append(seed)
+        return synthetic_loader(seed, n_days)
+
+    # Every pair takes 100 rows * 4 columns * 8 bytes, and 100 int32 dates
+    pairs = [(seed, 100) for seed in range(5)]
+    with PairPrefetcher(pairs, loader=loader, max_prefetch=10, memory_budget=7200) as prefetcher:
+        with prefetcher._condition:
+            prefetcher._condition.wait_for(lambda: len(prefetcher._ready) == 2, timeout=5)
+        assert prefetcher.ready_bytes == 7200
+        assert len(loaded) == 2
+
+        sources = [source for _, source in prefetcher]
+        assert len(sources) == 5
+
+def test_memory_budget_after_loading_error():
+    release = threading.Event()
+
+    def loader(seed, n_days):
+        if seed == 1:
+            raise KeyError(seed)
+        if seed == 2:
+            release.wait(5)
+        return synthetic_loader(seed, n_days)
+
+    pairs = [(seed, 100) for seed in range(3)]
+    with PairPrefetcher(pairs, loader=loader, max_prefetch=10, memory_budget=7200) as prefetcher:
+        with prefetcher._condition:
+            prefetcher._condition.wait_for(lambda: len(prefetcher._ready) == 2, timeout=5)
+            # The next pair is still expected to be as large as the last one loaded
+            assert prefetcher._last_nbytes == 3600
+        release.set()
+
+def test_memory_budget_counts_prepared_features():
+    pairs = [(seed, 100) for seed in range(3)]
+    prepare = lambda source: (source, np.zeros((100, 5)))
+    with PairPrefetcher(pairs, loader=synthetic_loader, max_prefetch=1, prepare=prepare) as prefetcher:
+        with prefetcher._condition:
+            prefetcher._condition.wait_for(lambda: len(prefetcher._ready) == 1, timeout=5)
+        assert prefetcher.ready_bytes == 3600 + 4000
+
+def test_closed_prefetcher_stops():
+    pairs = [(seed, 100) for seed in range(5)]
+    prefetcher = PairPrefetcher(pairs, loader=synthetic_loader, max_prefetch=1)
+    prefetcher.next_source()
+    prefetcher.next_source()
+    prefetcher.close()
+    with pytest.raises(StopIteration):
+        prefetcher.next_source()
+    assert list(prefetcher) == []
+
+def test_loading_errors_are_raised():
+    def loader(symbol_1, symbol_2):
+        raise KeyError(symbol_1)
+
+    with PairPrefetcher([('AAPL', 'MSFT')], loader=loader) as prefetcher:
+        with pytest.raises(KeyError):
+            prefetcher.next_source(timeout=5)
+        with pytest.raises(StopIteration):
+            prefetcher.next_source(timeout=5)
+
+def test_env_switches_pairs():
+    pairs = [(seed, 120) for seed in range(3)]
+    with PairPrefetcher(pairs, loader=synthetic_loader, prepare=lambda source: source) as prefetcher:
+        pair, source = prefetcher.next_source()
+        env = PairsTradingEnv(*pair, 5, 0, data_source=source)
+        for pair, source in prefetcher:
+            env.set_data_source(source)
+            env.reset()
+            _, _, done, info = env.step(Actions.HOLD.value, 1)
+            assert not done
+            assert info['date'] == source.dates[20]
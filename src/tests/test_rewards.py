@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv, PortfolioTradingEnv
+from ..gym_pairs_trading.envs.rewards import REWARD_MODES, make_reward
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticDataSource
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+@pytest.fixture
+def load_navs():
+    rng = np.random.default_rng(0)
+    return 10000 * np.cumprod(1 + rng.normal(0.0005, 0.01, (4, 200)), axis=1)
+
+def test_differential_sharpe_matches_definition(load_navs):
+    nav = load_navs[0]
+    eta = 0.05
+    reward_function = make_reward('differential_sharpe', eta=eta)
+
+    # The differential Sharpe ratio is the first order change of the moving average Sharpe ratio in eta
+    first_moment, second_moment = 0.0, 0.0
+    for t in range(1, len(nav)):
+        step_return = nav[t] / nav[t - 1] - 1
+        reward = reward_function(nav[t], nav[t - 1])
+
+        sharpe = lambda a, b: a / np.sqrt(b - a ** 2)
+        if t > 2:
+            small = 1e-6
+            expected = (sharpe(first_moment + small * (step_return - first_moment),
+                second_moment + small * (step_return ** 2 - second_moment)) - sharpe(first_moment, second_moment)) / small
+            assert reward == pytest.approx(expected, rel=1e-3)
+        first_moment += eta * (step_return - first_moment)
+        second_moment += eta * (step_return ** 2 - second_moment)
+
+@pytest.mark.parametrize('mode', list(REWARD_MODES))
+def test_batch_matches_single(load_navs, mode):
+    batch = make_reward(mode, n_episodes=4)
+    singles = [make_reward(mode) for _ in range(4)]
+    turnover = (np.arange(4) % 2).astype(float)
+    for t in range(1, load_navs.shape[1]):
+        rewards = batch(load_navs[:, t], load_navs[:, t - 1], turnover)
+        expected = [single(load_navs[i, t], load_navs[i, t - 1], turnover[i]) for i, single in enumerate(singles)]
+        assert np.allclose(rewards, expected)
+
+def test_drawdown_and_turnover_penalties():
+    drawdown = make_reward('drawdown', penalty=2.0)
+    assert drawdown(110, 100) == pytest.approx(0.1)
+    assert drawdown(99, 110) == pytest.approx(-0.1 - 2 * 0.1)
+    assert drawdown(104.5, 99) == pytest.approx(104.5 / 99 - 1)
+
+    turnover = make_reward('turnover', cost=0.01)
+    assert turnover(101, 100, 1) == pytest.approx(0.0)
+    assert make_reward('log_return')(110, 100) == pytest.approx(np.log(1.1))
+
+    with pytest.raises(ValueError):
+        make_reward('sharpe')
+
+def test_env_reward_modes():
+    data_source = SyntheticDataSource(n_days=100, seed=0)
+    env = PairsTradingEnv(None, None, 5, 1, data_source=data_source, reward_mode='log_return')
+    env.reset()
+    previous = env.portfolio_value
+    _, reward, _, _ = env.step(Actions.BUY.value, 1)
+    assert reward == pytest.approx(np.log(env.portfolio_value / previous))
+
+    env = PortfolioTradingEnv.from_data_sources([data_source], reward_mode='turnover', reward_kwargs={'cost': 0.5})
+    env.reset()
+    _, reward, _, _ = env.step([Actions.BUY.value])
+    assert reward == pytest.approx(env.portfolio_value / env.start_balance - 1.5)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from ..gym_pairs_trading import PairsTradingEnv
+from ..gym_pairs_trading.envs.synthetic_data import SyntheticPairGenerator, SyntheticDataSource, _ar1_filter
+from ..gym_pairs_trading.envs.trading_sim import Actions
+
+@pytest.fixture
+def load_data_source():
+    ds = SyntheticDataSource(n_days=600, seed=3, chunk_size=100, split_prob=0.01)
+    return ds
+
+def test_ar1_filter_matches_loop():
+    rng = np.random.default_rng(0)
+    phi = np.array([0.5, 0.9, 0.99])
+    shocks = rng.standard_normal((3, 37))
+    x0 = np.array([1.0, -2.0, 0.5])
+
+    expected = np.zeros_like(shocks)
+    previous = x0
+    for t in range(shocks.shape[1]):
+        previous = phi * previous + shocks[:, t]
+        expected[:, t] = previous
+
+    assert np.allclose(_ar1_filter(phi, shocks, x0), expected)
+
+def test_chunks_match_single_generation():
+    whole = SyntheticPairGenerator(n_pairs=4, seed=7).next_chunk(300)
+    parts = list(SyntheticPairGenerator(n_pairs=4, seed=7).chunks(300, chunk_size=300))
+    assert np.array_equal(whole['close'], parts[0]['close'])
+
+    chunks = list(SyntheticPairGenerator(n_pairs=4, seed=7).chunks(300, chunk_size=128))
+    assert [len(chunk['date']) for chunk in chunks] == [128, 128, 44]
+    assert chunks[0]['close'].shape == (4, 128, 2)
+    assert np.all(chunks[0]['low'] <= np.minimum(chunks[0]['open'], chunks[0]['close']))
+    assert np.all(chunks[0]['high'] >= np.maximum(chunks[0]['open'], chunks[0]['close']))
+
+def test_pairs_are_cointegrated():
+    generator = SyntheticPairGenerator(n_pairs=8, seed=1, jump_prob=0, regime_switch_prob=0)
+    chunk = generator.next_chunk(2000)
+    log_prices = np.log(chunk['adjusted_close'])
+    residual = log_prices[:, :, 0] - generator.hedge_ratio[:, None] * log_prices[:, :, 1]
+    assert np.all(np.std(residual, axis=1) < np.std(log_prices[:, :, 1], axis=1))
+
+def test_iteration_is_seeded(load_data_source):
+    first = [data for _, data in load_data_source]
+    second = [data for _, data in load_data_source]
+    assert len(first) == 600
+    assert np.array_equal(np.array(first), np.array(second))
+
+def test_splits_are_adjusted(load_data_source):
+    closes = np.array([data[:2] for _, data in load_data_source])
+    assert load_data_source.s1_split_coefficient * load_data_source.s2_split_coefficient > 1
+    assert np.max(np.abs(np.diff(np.log(closes), axis=0))) < np.log(2)
+
+def test_env_with_synthetic_data(load_data_source):
+    env = PairsTradingEnv(None, None, 5, 1, data_source=load_data_source)
+    obs = env.reset()
+    assert obs.shape == env.observation_space.shape
+    _, _, done, info = env.step(Actions.HOLD.value, 1)
+    assert not done
+    assert info['trading_day'] == env.trading_day